@@ -0,0 +1,125 @@
+# application_tracker.py (Which listings were already applied to, shared by all apply sessions)
+
+import hashlib
+import json
+import os
+import time
+
+import listing_store
+
+LEGACY_TRACKER_FILE = "applied_listings.json"  # The old list of applied links, imported once
+
+# --- Outcomes recorded per attempt ---
+SENT, ABORTED, FAILED = 'sent', 'aborted', 'failed'
+PENDING = 'pending'  # Claimed right before clicking send; followed by a SENT or FAILED row
+
+CLAIM_TIMEOUT_SECONDS = 300  # A claim without an outcome this old (crashed session) no longer blocks the listing
+
+
+def message_hash(message):
+    return hashlib.sha1(message.encode('utf-8')).hexdigest()[:16] if message else None
+
+
+class ApplicationTracker:
+    """Append-only log of application attempts (table 'applications' in the listing store) with
+    the OBIDs of sent applications held in a set for O(1) lookups.
+
+    Every attempt is one single-row insert, so several apply sessions can write at once (WAL).
+    Applications sent by another session are picked up before each lookup by reading only
+    the rows added since the last one. Right before sending, claim() reserves the listing in
+    a write transaction, so two sessions can never both click send for it.
+    """
+
+    def __init__(self):
+        conn = listing_store.connect()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS applications ("
+                "obid TEXT, applied_at REAL, outcome TEXT, message_hash TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_applications_obid ON applications (obid)")
+        # Own connection in autocommit mode, so claim() controls its transaction explicitly
+        self.claim_conn = listing_store.connect(listing_store.STORE_FILE)
+        self.claim_conn.isolation_level = None
+        self.applied = set()
+        self.last_rowid = 0
+        self.refresh()
+        self._import_legacy_file()
+
+    def refresh(self):
+        """Reads applications recorded since the last call (also by other sessions)."""
+        conn = listing_store.connect()
+        for rowid, obid, outcome in conn.execute(
+            "SELECT rowid, obid, outcome FROM applications WHERE rowid > ? ORDER BY rowid", (self.last_rowid,)
+        ):
+            if outcome == SENT:
+                self.applied.add(obid)
+            self.last_rowid = rowid
+
+    def _import_legacy_file(self):
+        if not os.path.exists(LEGACY_TRACKER_FILE):
+            return
+        try:
+            with open(LEGACY_TRACKER_FILE, 'r', encoding='utf-8') as f:
+                links = json.load(f)
+        except (OSError, ValueError):
+            return
+        imported_at = os.path.getmtime(LEGACY_TRACKER_FILE)
+        rows = [(obid, imported_at, SENT, None) for obid in {listing_store.obid_for({'link': link}) for link in links}
+                if obid not in self.applied]
+        if rows:
+            conn = listing_store.connect()
+            with conn:
+                conn.executemany("INSERT INTO applications (obid, applied_at, outcome, message_hash) VALUES (?, ?, ?, ?)", rows)
+            self.refresh()
+            print(f"   📥 Imported {len(rows)} applications from {LEGACY_TRACKER_FILE}.")
+
+    def __len__(self):
+        return len(self.applied)
+
+    def has_applied(self, listing):
+        self.refresh()
+        return listing_store.obid_for(listing) in self.applied
+
+    def claim(self, listing):
+        """Reserves a listing right before its send button is clicked. Returns False if it was
+        sent already, or another session claimed it within CLAIM_TIMEOUT_SECONDS.
+
+        Check and insert run in one BEGIN IMMEDIATE transaction: only one session at a time
+        can hold it, so the check cannot go stale before the claim is written.
+        """
+        obid = listing_store.obid_for(listing)
+        now = time.time()
+        conn = self.claim_conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            sent = conn.execute("SELECT 1 FROM applications WHERE obid = ? AND outcome = ? LIMIT 1", (obid, SENT)).fetchone()
+            latest = conn.execute(
+                "SELECT outcome, applied_at FROM applications WHERE obid = ? ORDER BY rowid DESC LIMIT 1", (obid,)
+            ).fetchone()
+            claimed = latest is not None and latest[0] == PENDING and now - latest[1] < CLAIM_TIMEOUT_SECONDS
+            if sent or claimed:
+                conn.execute("COMMIT")
+                return False
+            conn.execute(
+                "INSERT INTO applications (obid, applied_at, outcome, message_hash) VALUES (?, ?, ?, ?)",
+                (obid, now, PENDING, None),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return True
+
+    def record(self, listing, outcome, message=None):
+        """Logs one attempt; SENT also marks the listing as applied (and FAILED releases a claim)."""
+        obid = listing_store.obid_for(listing)
+        conn = listing_store.connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO applications (obid, applied_at, outcome, message_hash) VALUES (?, ?, ?, ?)",
+                (obid, time.time(), outcome, message_hash(message)),
+            )
+        if outcome == SENT:
+            self.applied.add(obid)
+            print("   💾 Marked as APPLIED in tracker.")
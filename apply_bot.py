@@ -1,54 +1,41 @@
 # apply_bot.py
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import Select
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+import argparse
+import threading
 import time
 import json
-import random
-import os
+from queue import Queue
 
 # Import configs
 from config import IMMOSCOUT_EMAIL, IMMOSCOUT_PASSWORD, USER_PHONE_NUMBER
-from message_generator import generate_ai_message
+import config
+from message_generator import MessagePool
 from telegram_notifier import send_telegram_message
+from rate_limiter import AdaptivePacer, looks_blocked
+from browser_session import initialize_driver, CHROME_DEBUGGER_ADDRESS
+from application_tracker import ApplicationTracker, SENT, ABORTED, FAILED
+import ranking
 
 # --- FILES ---
 INPUT_FILE = "filtered_results.json"
-APPLIED_TRACKER_FILE = "applied_listings.json" # NEW: Tracks successful applications
 
-def load_applied_listings():
-    """Loads the list of previously applied links."""
-    if not os.path.exists(APPLIED_TRACKER_FILE):
-        return []
-    try:
-        with open(APPLIED_TRACKER_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except:
-        return []
-
-def save_applied_listing(link):
-    """Appends a link to the tracker file immediately."""
-    applied = load_applied_listings()
-    if link not in applied:
-        applied.append(link)
-        with open(APPLIED_TRACKER_FILE, 'w', encoding='utf-8') as f:
-            json.dump(applied, f, ensure_ascii=False, indent=4)
-        print("   💾 Marked as APPLIED in tracker.")
-
-def initialize_driver():
-    """Initializes Chrome driver (NOT headless)."""
-    options = webdriver.ChromeOptions()
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option('useAutomationExtension', False)
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
-    return driver
+# List of keywords that indicate a swap offer
+SWAP_KEYWORDS = [
+    "tausch",           # Covers 'Tauschwohnung', 'Wohnungstausch', 'zum Tausch'
+    "swap",             # Covers 'Wohnungsswap', 'Swap'
+    "wohnungsswap",     # Specific platform
+    "tauschwohnung"     # Specific keyword
+]
+
+PAGE_LOAD_TIMEOUT = 20  # Seconds to wait for a preloaded tab to finish loading
+
+def is_swap_offer(title):
+    """Checks if ANY of the swap keywords exist in the lowercase title."""
+    return any(keyword in title.lower() for keyword in SWAP_KEYWORDS)
 
 def handle_cookie_banner(driver):
     """Attempts to accept cookies."""
@@ -67,6 +54,11 @@ def perform_login(driver):
     handle_cookie_banner(driver)
     time.sleep(2)
 
+    # The persistent profile keeps the session cookie; no login link means we are still logged in
+    if not driver.find_elements(By.CLASS_NAME, "sso-login-link"):
+        print("   ✅ Already logged in (saved browser profile). Skipping login.")
+        return
+
     try:
         login_link_element = driver.find_element(By.CLASS_NAME, "sso-login-link")
         login_url = login_link_element.get_attribute("href")
@@ -103,91 +95,301 @@ def perform_login(driver):
         print("👉 Please log in manually in the opened browser window.")
         input("👉 Press ENTER once you are logged in to continue... ")
 
-def fill_application_details(driver):
-    """Fills the specific dropdowns and inputs in the contact popup."""
-    print("   📝 Filling detailed profile information...")
-    wait = WebDriverWait(driver, 3)
-
-    # 1. Salutation
+# --- Contact form fields: profile key -> (data-testid, label). The phone number comes from USER_PHONE_NUMBER ---
+FORM_SELECTS = {
+    'salutation': ("salutation", "Salutation"),
+    'household_size': ("numberOfPersons", "Household Size"),
+    'pets': ("hasPets", "Pets"),
+    'employment': ("employmentRelationship", "Employment"),
+    'income': ("income", "Income"),
+    'documents': ("applicationPackageCompleted", "Docs"),
+}
+PHONE_TESTID = "phoneNumber"
+
+# The answers the bot always used; APPLICANT_PROFILE in config.py overrides single keys (older configs have none)
+DEFAULT_APPLICANT_PROFILE = {
+    'salutation': "MALE",
+    'household_size': "ONE_PERSON",
+    'pets': "FALSE",
+    'employment': "PUBLIC_EMPLOYEE",
+    'income': "OVER_3000_UPTO_4000",
+    'documents': "TRUE",
+}
+APPLICANT_PROFILE = {**DEFAULT_APPLICANT_PROFILE, **(getattr(config, 'APPLICANT_PROFILE', None) or {})}
+
+# Sets every field in one round trip. Values go through the native setters and input/change
+# events are dispatched, so the page's form state sees them like a user edit. Returns
+# {testid: 'set' | 'kept' | 'missing' | 'no-option'}, read back from the fields afterwards.
+BULK_FILL_SCRIPT = """
+const selects = arguments[0], phone = arguments[1], results = {};
+function fire(el) {
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+}
+for (const [testid, value] of Object.entries(selects)) {
+    const el = document.querySelector(`select[data-testid='${testid}']`);
+    if (!el) { results[testid] = 'missing'; continue; }
+    if (![...el.options].some(o => o.value === value)) { results[testid] = 'no-option'; continue; }
+    Object.getOwnPropertyDescriptor(HTMLSelectElement.prototype, 'value').set.call(el, value);
+    fire(el);
+    results[testid] = el.value === value ? 'set' : 'missing';
+}
+const input = document.querySelector("input[data-testid='phoneNumber']");
+if (!input) {
+    results.phoneNumber = 'missing';
+} else if (input.value || !phone) {
+    results.phoneNumber = 'kept';
+} else {
+    Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set.call(input, phone);
+    fire(input);
+    results.phoneNumber = input.value === phone ? 'set' : 'missing';
+}
+return results;
+"""
+
+def bulk_fill_application_details(driver):
+    """Fills all profile fields with a single execute_script. Returns the per-field results."""
+    selects = {testid: APPLICANT_PROFILE[key] for key, (testid, _) in FORM_SELECTS.items() if APPLICANT_PROFILE.get(key)}
+    return driver.execute_script(BULK_FILL_SCRIPT, selects, USER_PHONE_NUMBER) or {}
+
+def fill_select_slowly(driver, wait, testid, value, label, log=print):
+    """The step-by-step path: locate, scroll, pause, select (used when the bulk fill missed a field)."""
     try:
-        salutation_elem = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "select[data-testid='salutation']")))
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", salutation_elem)
-        time.sleep(0.5) 
-        Select(salutation_elem).select_by_value("MALE")
-        print("      -> Salutation set: Herr")
+        elem = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, f"select[data-testid='{testid}']")))
+        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", elem)
+        time.sleep(0.5)
+        Select(elem).select_by_value(value)
+        log(f"      -> {label} set: {value}")
     except Exception as e:
-        print(f"      -> Salutation skipped: {str(e).splitlines()[0]}")
+        log(f"      -> {label} skipped: {str(e).splitlines()[0]}")
 
-    # 2. Phone Number
+def fill_phone_slowly(driver, wait, log=print):
     try:
-        phone_elem = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "input[data-testid='phoneNumber']")))
+        phone_elem = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, f"input[data-testid='{PHONE_TESTID}']")))
         driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", phone_elem)
         if not phone_elem.get_attribute("value"):
             phone_elem.clear()
             phone_elem.send_keys(USER_PHONE_NUMBER)
-            print("      -> Phone number entered.")
+            log("      -> Phone number entered.")
         else:
-            print("      -> Phone number already present.")
+            log("      -> Phone number already present.")
     except Exception as e:
-        print(f"      -> Phone input skipped: {str(e).splitlines()[0]}")
+        log(f"      -> Phone input skipped: {str(e).splitlines()[0]}")
 
-    # 3. Household Size
-    try:
-        hh_elem = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "select[data-testid='numberOfPersons']")))
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", hh_elem)
-        time.sleep(0.5)
-        Select(hh_elem).select_by_value("ONE_PERSON")
-        print("      -> Household Size set: 1 Person")
-    except Exception as e:
-        print(f"      -> Household Size skipped: {str(e).splitlines()[0]}")
+def fill_application_details(driver, log=print):
+    """Fills the specific dropdowns and inputs in the contact popup.
 
-    # 4. Pets
+    Tries the one-call bulk fill first; any field it could not verify is filled the slow way.
+    """
+    log("   📝 Filling detailed profile information...")
     try:
-        pet_elem = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "select[data-testid='hasPets']")))
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", pet_elem)
-        time.sleep(0.5)
-        Select(pet_elem).select_by_value("FALSE")
-        print("      -> Pets set: No")
+        results = bulk_fill_application_details(driver)
     except Exception as e:
-        print(f"      -> Pets skipped: {str(e).splitlines()[0]}")
+        log(f"      -> Bulk fill failed: {str(e).splitlines()[0]}")
+        results = {}
 
-    # 5. Employment
-    try:
-        emp_elem = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "select[data-testid='employmentRelationship']")))
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", emp_elem)
-        time.sleep(0.5)
-        Select(emp_elem).select_by_value("PUBLIC_EMPLOYEE")
-        print("      -> Employment set: Angestellte:r")
-    except Exception as e:
-        print(f"      -> Employment dropdown skipped: {str(e).splitlines()[0]}")
+    done = [testid for testid, result in results.items() if result in ('set', 'kept')]
+    if done:
+        log(f"      -> Filled in one step: {', '.join(done)}")
 
-    # 6. Income
+    wait = WebDriverWait(driver, 3)
+    if results.get(PHONE_TESTID) not in ('set', 'kept'):
+        fill_phone_slowly(driver, wait, log)
+    for key, (testid, label) in FORM_SELECTS.items():
+        value = APPLICANT_PROFILE.get(key)
+        if value and results.get(testid) != 'set':
+            fill_select_slowly(driver, wait, testid, value, label, log)
+
+def prepare_application(driver, listing, messages, log=print):
+    """Opens the contact form on the current page, fills message and profile, and returns (send button, message)."""
+    # Open Contact Form
+    contact_button = WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button[data-testid='contact-button']")))
+    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", contact_button)
+    time.sleep(1)
+    contact_button.click()
+    log("   📩 Contact form opened.")
+
+    # Wait for Message Box
+    message_box = WebDriverWait(driver, 5).until(EC.visibility_of_element_located((By.CSS_SELECTOR, "textarea[data-testid='message']")))
+
+    # Generate AI Message (usually already done in the background)
+    log("   🤖 Generating AI message...")
+    final_message = messages.get(listing)
+    log("   ✅ AI Message generated.")
+
+    # Fill Message
+    message_box.clear()
+    message_box.send_keys(final_message)
+    log("   📝 Message text filled.")
+
+    # Fill Profile Details
+    fill_application_details(driver, log)
+
+    # --- REAL SENDING LOGIC ---
+    log("   🚀 Sending Application...")
+    time.sleep(1) # Brief pause before clicking send
+
+    # Locate Send Button
+    send_btn = WebDriverWait(driver, 3).until(
+        EC.element_to_be_clickable((By.CSS_SELECTOR, "button[type='submit'][qa-regression-tag='button']"))
+    )
+    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", send_btn)
+    return send_btn, final_message
+
+def open_in_background_tab(driver, url):
+    """Starts loading url in a new tab without waiting for it and stays on the current tab."""
+    current = driver.current_window_handle
+    before = set(driver.window_handles)
+    driver.execute_script("window.open(arguments[0], '_blank');", url)
+    tab = (set(driver.window_handles) - before).pop()
+    driver.switch_to.window(current)
+    return tab
+
+def send_listing_to_telegram(listing):
+    price = listing.get('warm_miete_numeric', listing.get('cold_miete', 'N/A'))
+    msg = (
+        f"🏠 *{listing['title']}*\n"
+        f"📍 {listing.get('address', 'N/A')}\n"
+        f"💰 {price}\n"
+        f"🔗 {listing['link']}"
+    )
+    send_telegram_message(msg)
+
+def ask_in_background(prompt):
+    """Shows the prompt and reads the answer in a daemon thread, so the browser can be driven
+    meanwhile. Returns a Queue that receives the answer ('' at end of input)."""
+    print(prompt, end='', flush=True)
+    answer = Queue(maxsize=1)
+
+    def read():
+        try:
+            answer.put(input())
+        except EOFError:
+            answer.put('')
+
+    threading.Thread(target=read, daemon=True).start()
+    return answer
+
+def prepare_in_new_tab(driver, listing, messages, pacer):
+    """Loads a listing in a new tab and opens and fills its contact form there, then returns to
+    the current tab. Its own messages are collected in 'log' (shown with the listing) rather than
+    printed, since the listing on screen is still the previous one."""
+    url = listing['link']
+    current = driver.current_window_handle
+    log = []
+    send_btn, message = None, None
+    pacer.wait(url)
+    tab = open_in_background_tab(driver, url)
+    driver.switch_to.window(tab)
     try:
-        income_elem = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "select[data-testid='income']")))
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", income_elem)
-        time.sleep(0.5)
-        Select(income_elem).select_by_value("OVER_3000_UPTO_4000")
-        print("      -> Income set: 3000-4000€")
-    except Exception as e:
-        print(f"      -> Income dropdown skipped: {str(e).splitlines()[0]}")
-
-    # 7. Docs Available
+        WebDriverWait(driver, PAGE_LOAD_TIMEOUT).until(lambda d: d.execute_script("return document.readyState") == "complete")
+    except Exception:
+        pass
+    blocked = looks_blocked(driver.current_url, driver.title)
+    pacer.report(url, blocked)
+    if not blocked:
+        try:
+            send_btn, message = prepare_application(driver, listing, messages, log=log.append)
+        except Exception as e:
+            log.append(f"   ❌ Could not prepare the form: {str(e).splitlines()[0]}")
+    driver.switch_to.window(current)
+    return {'tab': tab, 'send_btn': send_btn, 'message': message, 'blocked': blocked, 'log': log}
+
+def apply_pipelined(driver, listings, tracker, messages, pacer):
+    """Review with the next listing always one step ahead.
+
+    You are asked about listing N (form already open and filled) right away; while you decide,
+    listing N+1 is loaded and its form opened and filled in its own tab (the browser shows it
+    for a moment, then returns to N). Your answer is acted on once that is done. Every
+    confirmation is one keypress. Going back is not supported in this mode.
+    """
+    queue = [listing for listing in listings if not tracker.has_applied(listing) and not is_swap_offer(listing['title'])]
+    skipped = len(listings) - len(queue)
+    if skipped:
+        print(f"⏭️  Skipping {skipped} listings (already applied or swap offers).")
+    if not queue:
+        return
+
+    home = driver.current_window_handle
+    messages.prefetch(queue, 0)
+    ready = prepare_in_new_tab(driver, queue[0], messages, pacer)
     try:
-        docs_elem = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "select[data-testid='applicationPackageCompleted']")))
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", docs_elem)
-        time.sleep(0.5)
-        Select(docs_elem).select_by_value("TRUE")
-        print("      -> Docs set: Vorhanden")
-    except Exception as e:
-        print(f"      -> Docs dropdown skipped: {str(e).splitlines()[0]}")
+        for i, listing in enumerate(queue):
+            current, ready = ready, None
+            url = listing['link']
+            driver.switch_to.window(current['tab'])
+            for line in current['log']:
+                print(line)
+            send_btn, message = current['send_btn'], current['message']
+
+            print(f"\n" + "-"*60)
+            print(f"[{i+1}/{len(queue)}] 🔎 READY TO SEND")
+            print(f"🏠 Title:   {listing['title']}")
+            print(f"📍 Address: {listing.get('address', 'N/A')}")
+            print(f"💰 Price:   {listing.get('warm_miete_numeric', listing.get('cold_miete', 'N/A'))}")
+            print(f"🔗 Link:    {url}")
+            print("-" * 60)
+            if current['blocked']:
+                print("   🚨 CAPTCHA or access denied. Solve it in the browser, then press 'y' to fill the form.")
+            answer = ask_in_background("👉 Options: (y) Send, (n) Skip, (t) Telegram: ")
+
+            # The next listing is loaded and filled while this one is reviewed
+            if i + 1 < len(queue):
+                messages.prefetch(queue, i + 1)
+                ready = prepare_in_new_tab(driver, queue[i + 1], messages, pacer)
+            choice = answer.get().strip().lower()
+
+            if choice == 'y':
+                try:
+                    if send_btn is None:
+                        send_btn, message = prepare_application(driver, listing, messages)
+                    if not tracker.claim(listing):
+                        print("   ⏭️  Another session already applied to this one. Not sending.")
+                    else:
+                        print("   🚀 Clicking Send...")
+                        send_btn.click()
+                        print("   ✅ APPLICATION SENT SUCCESSFULLY!")
+                        tracker.record(listing, SENT, message)
+                        time.sleep(2)
+                except Exception as e:
+                    print(f"   ❌ Error applying to listing: {e}")
+                    tracker.record(listing, FAILED, message)
+            elif choice == 't':
+                print("   📨 Sending listing to Telegram...")
+                send_listing_to_telegram(listing)
+            else:
+                print("   ⏭️  Skipping (User rejected).")
 
+            driver.close()
+            driver.switch_to.window(home)
+    finally:
+        if ready:
+            driver.switch_to.window(ready['tab'])
+            driver.close()
+            driver.switch_to.window(home)
 
-def apply_to_listings(driver, listings):
+def apply_to_listings(driver, listings, pipelined=False):
     """Iterates through listings, checks tracker, asks for confirmation, sends, and saves."""
     
     # --- 1. LOAD TRACKER ---
-    applied_links = load_applied_listings()
-    print(f"\n🚀 Starting Application Run. Already applied to {len(applied_links)} listings.")
+    tracker = ApplicationTracker()
+    pacer = AdaptivePacer('apply')
+    print(f"\n🚀 Starting Application Run. Already applied to {len(tracker)} listings.")
+
+    # Messages are generated in the background a few listings ahead, so 'y' does not wait for the API.
+    # Closing the pool drops the ones not started yet when the review ends.
+    messages = MessagePool(wanted=lambda listing: not tracker.has_applied(listing) and not is_swap_offer(listing['title']))
+    try:
+        if pipelined:
+            apply_pipelined(driver, listings, tracker, messages, pacer)
+        else:
+            apply_interactively(driver, listings, tracker, messages, pacer)
+    finally:
+        messages.close()
+    pacer.print_stats()
+
+def apply_interactively(driver, listings, tracker, messages, pacer):
+    """Reviews listings one by one: open, (y) fill the form, check it, ENTER to send. (b) goes back."""
     i = 0
     choice = "start"
     while i < len(listings):
@@ -197,7 +399,7 @@ def apply_to_listings(driver, listings):
         title = listing['title']
         
         # --- 2. CHECK IF ALREADY APPLIED ---
-        if url in applied_links:
+        if tracker.has_applied(listing):
             print(f"⏭️  Skipping [{i+1}/{len(listings)}] (Already Applied): {title}")
             if choice != 'b':
                 i += 1
@@ -209,16 +411,7 @@ def apply_to_listings(driver, listings):
         address = listing.get('address', 'N/A')
 
         # --- 2.5 CHECK FOR SWAPS (Robust Filter) ---
-        # List of keywords that indicate a swap offer
-        swap_keywords = [
-            "tausch",           # Covers 'Tauschwohnung', 'Wohnungstausch', 'zum Tausch'
-            "swap",             # Covers 'Wohnungsswap', 'Swap'
-            "wohnungsswap",     # Specific platform
-            "tauschwohnung"     # Specific keyword
-        ]
-        
-        # Check if ANY of the keywords exist in the lowercase title
-        if any(keyword in title.lower() for keyword in swap_keywords):
+        if is_swap_offer(title):
             print(f"⚠️ Skipping Listing {i+1}: Swap/Trade offer detected ({title})")
             if choice != 'b':
                 i += 1
@@ -226,6 +419,8 @@ def apply_to_listings(driver, listings):
                 i -= 1
             continue
 
+        messages.prefetch(listings, i)
+
         # --- 3. NAVIGATE & DISPLAY INFO ---
         print(f"\n" + "-"*60)
         print(f"[{i+1}/{len(listings)}] 🔎 CANDIDATE REVIEW")
@@ -236,8 +431,12 @@ def apply_to_listings(driver, listings):
         print("-" * 60)
 
         print(f"🔄 Opening listing...")
+        pacer.wait(url)
         driver.get(url)
-        time.sleep(1.5)
+        blocked = looks_blocked(driver.current_url, driver.title)
+        pacer.report(url, blocked)
+        if blocked:
+            print("   🚨 CAPTCHA or access denied. Solve it in the browser before choosing.")
 
         # --- 4. MANUAL INPUT PROMPT ---
         prompt_text = "👉 Options: (y) Apply, (n) Skip, (t) Slack, (b) Back: "
@@ -256,13 +455,7 @@ def apply_to_listings(driver, listings):
         # Option T: SLACK
         elif choice == 't':
             print("   📨 Sending listing to Slack...")
-            msg = (
-                f"🏠 *{title}*\n"
-                f"📍 {address}\n"
-                f"💰 {price}\n"
-                f"🔗 {url}"
-            )
-            send_telegram_message(msg)
+            send_listing_to_telegram(listing)
             print("   ⏭️  Skipping application for now.")
             i += 1 # Move forward
             continue
@@ -277,40 +470,9 @@ def apply_to_listings(driver, listings):
         # IF 'Y': PROCEED WITH FORM FILLING
         # ============================================================
 
+        message = None
         try:
-            # Open Contact Form
-            contact_button = WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button[data-testid='contact-button']")))
-            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", contact_button)
-            time.sleep(1)
-            contact_button.click()
-            print("   📩 Contact form opened.")
-            
-            # Wait for Message Box
-            message_box = WebDriverWait(driver, 5).until(EC.visibility_of_element_located((By.CSS_SELECTOR, "textarea[data-testid='message']")))
-
-            # Generate AI Message
-            print("   🤖 Generating AI message...")
-            price_str = listing.get('warm_miete_numeric', listing.get('cold_miete', 'N/A'))
-            final_message = generate_ai_message(listing_title=listing['title'], listing_address=listing['address'], listing_price=str(price_str))
-            print("   ✅ AI Message generated.")
-            
-            # Fill Message
-            message_box.clear()
-            message_box.send_keys(final_message)
-            print("   📝 Message text filled.")
-
-            # Fill Profile Details
-            fill_application_details(driver)
-            
-            # --- REAL SENDING LOGIC ---
-            print("   🚀 Sending Application...")
-            time.sleep(1) # Brief pause before clicking send
-            
-            # Locate Send Button
-            send_btn = WebDriverWait(driver, 3).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, "button[type='submit'][qa-regression-tag='button']"))
-            )
-            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", send_btn)
+            send_btn, message = prepare_application(driver, listing, messages)
 
             # --- 5. FINAL CONFIRMATION (To Click Send) ---
             # The bot waits here indefinitely for you to check the form visually
@@ -319,26 +481,38 @@ def apply_to_listings(driver, listings):
             
             if final_check.strip().lower() == 's':
                 print("   🚫 Aborted by user. Not sending.")
-                continue # Skip to next listing without saving to tracker
+                tracker.record(listing, ABORTED, message)
+                continue # Skip to next listing without marking it as applied
 
             # --- REAL SENDING LOGIC ---
+            # Reserve the listing first: another session may have sent it during the review
+            if not tracker.claim(listing):
+                print("   ⏭️  Another session already applied to this one. Not sending.")
+                i += 1
+                continue
+
             print("   🚀 Clicking Send...")
             send_btn.click()
             
             print("   ✅ APPLICATION SENT SUCCESSFULLY!")
             
             # --- 6. SAVE TO TRACKER ---
-            save_applied_listing(url)
+            tracker.record(listing, SENT, message)
             
             # Wait a moment to let the success message appear
             time.sleep(2)
             
         except Exception as e:
             print(f"   ❌ Error applying to listing: {e}")
+            tracker.record(listing, FAILED, message)
         i += 1
-        time.sleep(random.uniform(2, 4))
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Review and apply to the filtered listings, best-scored first.")
+    parser.add_argument("--top", type=int, default=ranking.TOP_K, help=f"Only the N best-scored listings (default: {ranking.TOP_K}; 0 = all)")
+    parser.add_argument("--pipeline", action="store_true", help="Preload the next listing in a background tab; one keypress per application")
+    args = parser.parse_args()
+
     # Load Data
     try:
         with open(INPUT_FILE, 'r', encoding='utf-8') as f:
@@ -351,11 +525,15 @@ if __name__ == '__main__':
         print("❌ No listings found.")
         exit()
 
-    driver = initialize_driver()
+    # Best candidates first (see ranking.py for the weights)
+    filtered_data = ranking.top_listings(filtered_data, args.top or len(filtered_data))
+    print(f"🏆 Reviewing the {len(filtered_data)} best-scored listings.")
+
+    driver = initialize_driver(profile="apply", attach=CHROME_DEBUGGER_ADDRESS)
 
     try:
         perform_login(driver)
-        apply_to_listings(driver, filtered_data)
+        apply_to_listings(driver, filtered_data, pipelined=args.pipeline)
     finally:
         print("\n🏁 Process finished.")
         # driver.quit()
\ No newline at end of file
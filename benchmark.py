@@ -0,0 +1,287 @@
+# benchmark.py (Timing runs for the hot paths on synthetic data; nothing is scraped or written)
+
+import argparse
+import random
+import re
+import time
+
+import data_cleaner
+import district_analyzer
+import ranking
+import scraper
+import subscriber_matcher
+from berlin_zip_map import BEZIRKE, bezirk_for
+
+STREETS = ["Hauptstraße", "Sonnenallee", "Karl-Marx-Straße", "Spandauer Damm", "Alt-Moabit", "Kiefholzstraße",
+           "Tempelhofer Damm", "Schönhauser Allee", "Frankfurter Allee", "Berliner Straße", "Am Treptower Park"]
+
+
+def _timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - started, result
+
+
+# --- Districts ---
+
+def legacy_find_district(address):
+    """The previous per-name scan, kept here as the baseline."""
+    address_lower = address.lower()
+    for lower_name, proper_name in district_analyzer.DISTRICT_LOWER_MAP.items():
+        if address_lower.startswith(lower_name):
+            end_index = len(lower_name)
+            if end_index == len(address_lower) or address_lower[end_index] in [',', ' ', '(', '-']:
+                return proper_name
+        if f" {lower_name}" in address_lower or f",{lower_name}" in address_lower:
+            return proper_name
+    return None
+
+
+def synthetic_addresses(count, padding=0, seed=42):
+    """Addresses shaped like the search cards: 'street no, ZIP Berlin, Ortsteil'.
+
+    padding adds filler words to make addresses longer without adding district mentions.
+    """
+    rng = random.Random(seed)
+    names = district_analyzer.BERLIN_DISTRICT_NAMES
+    addresses = []
+    for _ in range(count):
+        filler = " ".join(rng.choice(["Hinterhaus", "Seitenflügel", "Etage", "Nähe", "Park"]) for _ in range(padding))
+        addresses.append(f"{rng.choice(STREETS)} {rng.randint(1, 200)} {filler}, "
+                         f"{rng.randint(10115, 14199)} Berlin, {rng.choice(names)}")
+    return addresses
+
+
+def bench_districts(count):
+    print(f"🏷️ District tagging, {count} synthetic addresses")
+    for padding in (0, 10, 40):
+        addresses = synthetic_addresses(count, padding)
+        chars = sum(len(a) for a in addresses)
+        legacy_s, _ = _timed(lambda: [legacy_find_district(a) for a in addresses])
+        compiled_s, _ = _timed(lambda: [district_analyzer.find_district(a) for a in addresses])
+        print(f"   avg {chars // count:>4} chars | legacy scan {legacy_s:6.2f}s | compiled {compiled_s:6.2f}s "
+              f"({compiled_s / chars * 1e9:5.0f} ns/char) | speed-up x{legacy_s / compiled_s:.1f}")
+
+
+# --- Cleaning ---
+
+def legacy_clean_money(value_str):
+    """The previous per-row parsers, kept here as the baseline."""
+    if not value_str or "N/A" in value_str:
+        return None
+    clean_str = value_str.replace('€', '').replace('~', '').strip()
+    if '-' in clean_str:
+        parts = clean_str.split('-')
+        low, high = legacy_clean_money(parts[0]), legacy_clean_money(parts[1])
+        if low is not None and high is not None:
+            return int((low + high) / 2)
+        return low or high
+    try:
+        if ',' in clean_str:
+            clean_str = clean_str.split(',')[0]
+        return int(clean_str.replace('.', ''))
+    except ValueError:
+        return None
+
+
+def legacy_clean_size(value_str):
+    if not value_str or "N/A" in value_str:
+        return None
+    clean_str = value_str.replace('m²', '').strip()
+    if '-' in clean_str:
+        parts = clean_str.split('-')
+        low, high = legacy_clean_size(parts[0]), legacy_clean_size(parts[1])
+        if low and high:
+            return round((low + high) / 2, 2)
+        return low or high
+    try:
+        return float(clean_str.replace('.', '').replace(',', '.'))
+    except ValueError:
+        return None
+
+
+def legacy_clean_rooms(value_str):
+    if not value_str or "N/A" in value_str:
+        return None
+    try:
+        val = float(re.sub(r'[^\d\.]', '', value_str.replace(',', '.').strip()))
+        return int(val) if val.is_integer() else val
+    except ValueError:
+        return None
+
+
+def synthetic_listings(count, seed=42):
+    """Raw card/expose strings in the formats seen on ImmoScout24."""
+    rng = random.Random(seed)
+
+    def money():
+        value = rng.randint(300, 3500)
+        text = f"{value:,}".replace(",", ".")
+        roll = rng.random()
+        if roll < 0.1:
+            return f"~{text} €"
+        if roll < 0.15:
+            return f"{text} - {f'{value + rng.randint(50, 900):,}'.replace(',', '.')} €"
+        if roll < 0.25:
+            return f"{text},{rng.randint(0, 99):02d} €"
+        if roll < 0.3:
+            return "N/A"
+        return f"{text} €"
+
+    listings = []
+    for _ in range(count):
+        listings.append({
+            'cold_miete': money(),
+            'warm_miete': money(),
+            'size_m2': f"{rng.randint(18, 160)},{rng.choice(['00', '5', '36', '80'])} m²",
+            'rooms': rng.choice(["1", "1,5", "2", "2,5", "3", "4", "5", "N/A"]),
+        })
+    return listings
+
+
+def bench_cleaning(count):
+    print(f"🧹 Cleaning, {count} synthetic listings")
+    listings = synthetic_listings(count)
+
+    def per_row():
+        return [(legacy_clean_money(l['cold_miete']), legacy_clean_money(l['warm_miete']),
+                 legacy_clean_size(l['size_m2']), legacy_clean_rooms(l['rooms'])) for l in listings]
+
+    def per_row_cached():
+        return [data_cleaner.clean_listing(dict(l)) for l in listings]
+
+    legacy_s, _ = _timed(per_row)
+    columnar_s, _ = _timed(data_cleaner.clean_columns, listings)
+    distinct = sum(len(set(l[field] for l in listings)) for field in ('cold_miete', 'warm_miete', 'size_m2', 'rooms'))
+    print(f"   per-row (old) {legacy_s:6.2f}s | columnar {columnar_s:6.2f}s | speed-up x{legacy_s / columnar_s:.1f} "
+          f"| {distinct} distinct raw strings")
+
+    # The parse cache is warm now, as it would be when re-cleaning the stored history
+    warm_columnar_s, _ = _timed(data_cleaner.clean_columns, listings)
+    warm_row_s, _ = _timed(per_row_cached)
+    print(f"   warm parse cache: columnar {warm_columnar_s:6.2f}s | per-row {warm_row_s:6.2f}s")
+    data_cleaner.parse_cache.print_stats()
+
+
+# --- Matching ---
+
+TITLE_WORDS = ["Balkon", "Altbau", "Neubau", "WBS", "Tausch", "ruhig", "hell", "Garten", "möbliert", "Dachgeschoss"]
+
+
+def synthetic_subscriptions(count, rng):
+    names = district_analyzer.BERLIN_DISTRICT_NAMES
+    subscriptions = []
+    for i in range(count):
+        settings = {}
+        if rng.random() < 0.8:
+            settings['districts'] = rng.sample(names, rng.randint(1, 8))
+        if rng.random() < 0.2:
+            settings['bezirke'] = rng.sample(BEZIRKE, 2)
+        if rng.random() < 0.9:
+            settings['max_warm_rent'] = rng.randrange(600, 2500, 50)
+        if rng.random() < 0.5:
+            settings['min_warm_rent'] = rng.randrange(300, 900, 50)
+        if rng.random() < 0.7:
+            settings['min_size'] = rng.randrange(20, 90, 5)
+        if rng.random() < 0.6:
+            settings['min_rooms'] = rng.choice([1, 1.5, 2, 3])
+        if rng.random() < 0.2:
+            settings['keywords'] = rng.sample(TITLE_WORDS, 2)
+        if rng.random() < 0.3:
+            settings['exclude'] = ["WBS", "Tausch"]
+        subscriptions.append(subscriber_matcher.make_subscription(f"subscriber_{i}", **settings))
+    return subscriptions
+
+
+def synthetic_cleaned_listings(count, rng):
+    names = district_analyzer.BERLIN_DISTRICT_NAMES
+    listings = []
+    for _ in range(count):
+        district = rng.choice(names)
+        listings.append({
+            'title': " ".join(rng.sample(TITLE_WORDS, 3)) + " Wohnung",
+            'district': district,
+            'bezirk': bezirk_for(district),
+            'warm_miete_numeric': rng.randrange(400, 2600, 10),
+            'size_numeric': rng.randint(20, 140),
+            'rooms_numeric': rng.choice([1, 1.5, 2, 2.5, 3, 4]),
+        })
+    return listings
+
+
+def bench_matching(listing_count, subscriber_count):
+    print(f"👥 Routing {listing_count} listings to {subscriber_count} saved searches")
+    rng = random.Random(42)
+    subscriptions = synthetic_subscriptions(subscriber_count, rng)
+    listings = synthetic_cleaned_listings(listing_count, rng)
+
+    build_s, matcher = _timed(subscriber_matcher.SubscriberMatcher, subscriptions)
+    masks_s, _ = _timed(lambda: [matcher.match_mask(l) for l in listings])
+    route_s, routed = _timed(matcher.route, listings)
+    pairs = sum(len(matches) for matches in routed.values())
+
+    # Checking every saved search one by one, on a sample to keep the run short
+    sample = listings[:max(1, listing_count // 10)]
+    naive_s, _ = _timed(lambda: [[s for s in subscriptions if subscriber_matcher.subscription_matches(s, l)] for l in sample])
+    naive_s *= listing_count / len(sample)
+    print(f"   index build {build_s * 1000:6.1f}ms | matching {masks_s * 1000:6.1f}ms | "
+          f"routing incl. result lists {route_s * 1000:6.1f}ms ({pairs} listing/subscriber pairs)")
+    print(f"   per-profile check (extrapolated) {naive_s:6.2f}s | speed-up x{naive_s / route_s:.0f}")
+
+
+# --- Ranking ---
+
+def bench_ranking(stored_count, fresh_count):
+    print(f"🏆 Top {ranking.TOP_K} over {stored_count} stored and {fresh_count} freshly scraped listings")
+    rng = random.Random(42)
+    now = time.time()
+    stored = synthetic_cleaned_listings(stored_count, rng)
+    for i, listing in enumerate(stored):
+        listing['link'] = f"https://www.immobilienscout24.de/expose/{i}"
+        listing['scraped_at'] = now - rng.uniform(1, 10) * ranking.FRESHNESS_DAY_SECONDS
+    fresh = []
+    for i, numbers in enumerate(synthetic_cleaned_listings(fresh_count, rng), stored_count):
+        # Streamed the way pipeline.py gets them: built from the card, then enriched, tagged and cleaned
+        listing = scraper.build_listing(str(i), numbers['title'], "Hauptstraße 1, Berlin", [])
+        listing.update(numbers)
+        fresh.append(listing)
+
+    leaders = ranking.TopK()
+    stored_s, _ = _timed(lambda: [leaders.add(l) for l in stored])
+    fresh_s, entered = _timed(lambda: sum(leaders.add(l) for l in fresh))
+    full_s, _ = _timed(ranking.top_listings, stored + fresh)
+    print(f"   TopK stored {stored_s * 1000:6.1f}ms | fresh {fresh_s * 1000:6.1f}ms ({entered} entered) "
+          f"| full re-rank {full_s * 1000:6.1f}ms")
+
+    # A fresh copy of the best stored listing must outrank it (it differs only in age)
+    best = leaders.best()[0]
+    copy = scraper.build_listing("fresh", best['title'], "Hauptstraße 1, Berlin", [])
+    copy.update({key: best[key] for key in ('district', 'bezirk', 'warm_miete_numeric', 'size_numeric', 'rooms_numeric')})
+    if not (leaders.add(copy) and leaders.rank_of(copy) == 1):
+        raise SystemExit("❌ A freshly scraped listing does not outrank an older stored one.")
+    print("   ✅ A freshly scraped listing outranks the same listing stored days ago.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark pipeline hot paths on synthetic data.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    districts = sub.add_parser("districts", help="Compiled district matcher vs. the old linear name scan")
+    districts.add_argument("--count", type=int, default=100_000)
+    cleaning = sub.add_parser("cleaning", help="Columnar cleaner vs. the old per-row parsers")
+    cleaning.add_argument("--count", type=int, default=300_000)
+    matching = sub.add_parser("matching", help="Indexed subscriber matching vs. checking every saved search")
+    matching.add_argument("--listings", type=int, default=10_000)
+    matching.add_argument("--subscribers", type=int, default=1_000)
+    rank = sub.add_parser("ranking", help="Incremental top-K with freshly scraped listings vs. a full re-rank")
+    rank.add_argument("--stored", type=int, default=10_000)
+    rank.add_argument("--fresh", type=int, default=1_000)
+    args = parser.parse_args()
+
+    if args.command == "districts":
+        bench_districts(args.count)
+    elif args.command == "cleaning":
+        bench_cleaning(args.count)
+    elif args.command == "matching":
+        bench_matching(args.listings, args.subscribers)
+    elif args.command == "ranking":
+        bench_ranking(args.stored, args.fresh)
@@ -0,0 +1,126 @@
+# browser_session.py (Shared Chrome start-up, persistent profiles and session pool)
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+import os
+import queue
+import threading
+
+import config
+
+# Settings added after the first config.py versions; older config files may not have them
+CHROME_PROFILE_DIR = getattr(config, 'CHROME_PROFILE_DIR', None) or "chrome_profiles"
+CHROME_DEBUGGER_ADDRESS = getattr(config, 'CHROME_DEBUGGER_ADDRESS', "")
+
+# --- File Definitions ---
+DRIVER_PATH_CACHE = ".chromedriver_path"  # Remembers the chromedriver binary between runs
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+
+def get_driver_path():
+    """Returns the chromedriver binary path, only asking webdriver-manager when the cached one is gone."""
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path and os.path.exists(_driver_path):
+            return _driver_path
+        try:
+            with open(DRIVER_PATH_CACHE, 'r', encoding='utf-8') as f:
+                cached = f.read().strip()
+            if cached and os.path.exists(cached):
+                _driver_path = cached
+                return _driver_path
+        except FileNotFoundError:
+            pass
+
+        print("⬇️ Resolving chromedriver (first run or cache invalid)...")
+        _driver_path = ChromeDriverManager().install()
+        try:
+            with open(DRIVER_PATH_CACHE, 'w', encoding='utf-8') as f:
+                f.write(_driver_path)
+        except Exception as e:
+            print(f"⚠️ Could not cache chromedriver path: {e}")
+        return _driver_path
+
+
+def profile_path(name):
+    """Absolute user-data-dir for a named profile below CHROME_PROFILE_DIR."""
+    return os.path.abspath(os.path.join(CHROME_PROFILE_DIR, name))
+
+
+def initialize_driver(profile="default", attach=""):
+    """Initializes and returns a Chrome WebDriver configured to look more human.
+
+    profile: name of a persistent user-data-dir, so cookies and logins survive between runs.
+             Pass None for a throw-away profile.
+    attach:  'host:port' of a Chrome started with --remote-debugging-port; when set, no new
+             browser is launched. Only entry points that run a single session pass
+             CHROME_DEBUGGER_ADDRESS here: two sessions attached to one browser would drive
+             the same tab against each other.
+    """
+    service = Service(get_driver_path())
+    options = webdriver.ChromeOptions()
+
+    if attach:
+        # The running browser keeps its own flags and profile; Chrome rejects the others here
+        options.debugger_address = attach
+        print(f"🔌 Attaching to running Chrome at {attach}")
+        return webdriver.Chrome(service=service, options=options)
+
+    if profile:
+        options.add_argument(f"--user-data-dir={profile_path(profile)}")
+    options.add_argument(f"user-agent={USER_AGENT}")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+    return webdriver.Chrome(service=service, options=options)
+
+
+class SessionPool:
+    """Hands out up to `size` browser sessions, each on its own persistent profile.
+
+    Sessions are started lazily on first acquire and reused until close_all().
+    """
+
+    def __init__(self, size, prefix="session"):
+        self.size = size
+        self.prefix = prefix
+        self.idle = queue.Queue()
+        self.created = 0
+        self.sessions = []
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Returns an idle session, starting a new one if the pool is not full yet."""
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        name = None
+        with self.lock:
+            if self.created < self.size:
+                name = f"{self.prefix}_{self.created}"
+                self.created += 1
+        if name is None:
+            return self.idle.get()
+        # Attaching would hand every slot the same browser, so pooled sessions always launch their own
+        new_session = initialize_driver(profile=name)
+        with self.lock:
+            self.sessions.append(new_session)
+        return new_session
+
+    def release(self, session):
+        """Returns a session to the pool for the next caller."""
+        self.idle.put(session)
+
+    def close_all(self):
+        with self.lock:
+            sessions, self.sessions = self.sessions, []
+        for session in sessions:
+            try:
+                session.quit()
+            except Exception:
+                pass
@@ -10,6 +10,23 @@ BASE_SEARCH_URL = ""
 # Setting this too high might trigger anti-bot measures more frequently.
 MAX_SCRAPE_PAGE = 100
 
+# Folder for the persistent Chrome profiles (cookies and logins survive between runs).
+CHROME_PROFILE_DIR = "chrome_profiles"
+
+# Optional: attach to an already running Chrome instead of launching a new one.
+# Start Chrome with --remote-debugging-port=9222 and set this to "127.0.0.1:9222".
+CHROME_DEBUGGER_ADDRESS = ""
+
+
+# --- 👀 WATCH MODE (watcher.py) ---
+
+# Seconds between polls of the first search page, and the random +/- fraction applied to it.
+WATCH_INTERVAL_SECONDS = 60
+WATCH_JITTER = 0.3
+
+# Local port for the health/status endpoint (http://127.0.0.1:<port>/status). 0 disables it.
+STATUS_PORT = 8765
+
 
 # --- 👤 USER CREDENTIALS (For Application Bot) ---
 
@@ -22,6 +39,16 @@ IMMOSCOUT_PASSWORD = ""
 # Your Phone Number (for the application form)
 USER_PHONE_NUMBER = ""
 
+# Answers for the dropdowns in the contact form (the option values ImmoScout24 uses)
+APPLICANT_PROFILE = {
+    'salutation': "MALE",                     # MALE, FEMALE
+    'household_size': "ONE_PERSON",           # ONE_PERSON, TWO_PERSONS, THREE_PERSONS, ...
+    'pets': "FALSE",                          # TRUE, FALSE
+    'employment': "PUBLIC_EMPLOYEE",          # e.g. PUBLIC_EMPLOYEE, WORKER, SELF_EMPLOYED, STUDENT
+    'income': "OVER_3000_UPTO_4000",          # e.g. OVER_2000_UPTO_3000, OVER_3000_UPTO_4000
+    'documents': "TRUE",                      # Application package (Schufa, payslips) ready: TRUE, FALSE
+}
+
 
 # --- 🤖 OPENAI SETTINGS (For AI Message Generation) ---
 
@@ -29,6 +56,15 @@ USER_PHONE_NUMBER = ""
 # Required for generating unique, context-aware application messages.
 OPENAI_API_KEY = ""
 
+# Leave empty for api.openai.com. Set to any OpenAI-compatible endpoint (e.g. "http://localhost:8000/v1" for a local test server).
+OPENAI_BASE_URL = ""
+
+# Chat model used for the application messages
+OPENAI_MODEL = "gpt-3.5-turbo"
+
+# How many messages apply_bot.py generates in parallel while you review listings
+MESSAGE_WORKERS = 4
+
 
 # --- 📝 USER PROFILE (For AI & Messages) ---
 
@@ -37,6 +73,13 @@ OPENAI_API_KEY = ""
 USER_BACKGROUND = """
 """
 
+# Without an OpenAI key, messages are composed locally (message_composer.py) from the listing's
+# district, rooms, size, rent and title. This paragraph about you is inserted into every one of them.
+ABOUT_ME = """[2-3 sentences about you: job, income, household, documents]"""
+
+# Your name under the locally composed messages
+MESSAGE_SIGNATURE = "[Your Name]"
+
 # Fallback message template if the AI generation fails.
 # The {address} placeholder will be automatically filled by the script.
 GENERIC_FALLBACK_MESSAGE = """Sehr geehrte Damen und Herren,
@@ -1,129 +1,313 @@
-import json
+import argparse
 import re
+from itertools import islice
+
+import listing_store
 
 # --- File Definitions ---
 INPUT_FILE = "listings_with_districts.json"
 OUTPUT_FILE = "listings_final_numeric.json"
 
-def clean_money_string(value_str):
-    """
-    Converts German currency strings (e.g., '1.099 €', '~880 €', '860 - 1.300 €') to integers.
-    Removes '~' (approximate) and '€'.
+PARSE_CACHE_SIZE = 200_000  # Distinct raw strings kept in the parse cache (least recently used are dropped)
+PARSE_CACHE_SLACK = 10  # Trim only after size/10 extra entries, so eviction is one pass per batch
+PARSER_VERSION = 2  # Bump whenever _parse_amount changes: cached results of older versions are dropped
+PARSE_CACHE_TABLE = f"parse_cache_v{PARSER_VERSION}"
+
+# One number as written on the cards: "1.099", "31,36", "2,5", "65.5" or "1.250,50"
+NUMBER_REGEX = re.compile(r'\d+(?:[.,]\d+)*')
+
+
+def parse_german_number(token):
+    """Converts one number token to float. Dots followed by exactly three digits are thousands separators."""
+    if token.isdigit():
+        return float(token)
+    if ',' in token:
+        return float(token.replace('.', '').replace(',', '.', 1).replace(',', ''))
+    groups = token.split('.')
+    if len(groups) > 1 and all(len(group) == 3 for group in groups[1:]):
+        return float(''.join(groups))
+    return float(token)
+
+
+# Characters around a number on the cards: currency, '~' for estimates, units
+STRIP_CHARS = " ~€m²\xa0"
+
+
+def _plain_number(text):
+    """String-op parser for one stripped number in the usual formats ('1.099', '31,36', '2,5', '65.5').
+
+    Returns None for anything else; _parse_amount then falls back to the regex parser.
     """
-    if not value_str or "N/A" in value_str:
+    if text.isdigit():
+        return float(text)
+    if ',' in text:
+        joined = text.replace('.', '').replace(',', '.', 1)
+        if text[0] != ',' and joined.replace('.', '', 1).isdigit():
+            return float(joined)
+    elif text.count('.') == 1:
+        digits = text.replace('.', '')
+        if digits.isdigit():
+            # One dot followed by exactly three digits is a thousands separator
+            return float(digits) if text[-4:-3] == '.' else float(text)
+    return None
+
+
+def _parse_tokens(value_str):
+    """Regex parser for the rare formats the string-op path does not take (e.g. '1.250.000,50', '2 Zi.')."""
+    tokens = NUMBER_REGEX.findall(value_str)
+    if not tokens:
         return None
-    
-    # --- FIX: Remove '~', '€' and whitespace ---
-    clean_str = value_str.replace('€', '').replace('~', '').strip()
-    
-    # Handle ranges like "860 - 1.300"
-    if '-' in clean_str:
-        parts = clean_str.split('-')
-        try:
-            # Recursive call to clean individual parts
-            low = clean_money_string(parts[0])
-            high = clean_money_string(parts[1])
-            if low is not None and high is not None:
-                return int((low + high) / 2) # Return average
-            return low or high
-        except:
-            return None
-
-    # Remove thousands separator (.) and convert to int
-    # Example: "1.099" -> "1099"
     try:
-        # Also remove potential decimal parts if warm rent has cents (e.g., 880,50 -> 880)
-        if ',' in clean_str:
-             clean_str = clean_str.split(',')[0]
-             
-        clean_str = clean_str.replace('.', '') 
-        return int(clean_str)
+        if len(tokens) == 1:
+            return parse_german_number(tokens[0])
+        return (parse_german_number(tokens[0]) + parse_german_number(tokens[1])) / 2
     except ValueError:
         return None
 
-def clean_size_string(value_str):
-    """
-    Converts German size strings (e.g., '31,36 m²') to floats.
-    """
+
+def _parse_amount(value_str):
     if not value_str or "N/A" in value_str:
         return None
-    
-    # Remove 'm²' and whitespace
-    clean_str = value_str.replace('m²', '').strip()
-    
-    # Handle ranges like "21,00 - 37,00"
-    if '-' in clean_str:
-        parts = clean_str.split('-')
+    if '-' not in value_str:
+        value = _plain_number(value_str.strip(STRIP_CHARS))
+    else:
+        low, _, high = value_str.partition('-')
+        low, high = _plain_number(low.strip(STRIP_CHARS)), _plain_number(high.strip(STRIP_CHARS))
+        value = (low + high) / 2 if low is not None and high is not None else None
+    return value if value is not None else _parse_tokens(value_str)
+
+
+class ParseCache:
+    """Bounded LRU cache of raw string -> parsed amount, shared by the money, size and room cleaners.
+
+    Persisted in the listing store database between runs, in a table per PARSER_VERSION.
+    Only entries parsed since the last save are written; the table keeps the newest `size` of them.
+    """
+
+    def __init__(self, size=PARSE_CACHE_SIZE):
+        self.size = size
+        self.values = {}  # Insertion ordered: least recently used first
+        self.unsaved = {}  # Raw strings parsed since the last save (the keys), in parse order
+        self.hits = 0
+        self.misses = 0
+        self.loaded = False
+
+    def _trim(self):
+        """Drops the least recently used entries in one pass once the cache has grown 1/PARSE_CACHE_SLACK over its size."""
+        if len(self.values) > self.size + self.size // PARSE_CACHE_SLACK:
+            self.values = dict(islice(self.values.items(), len(self.values) - self.size, None))
+
+    def get(self, raw):
+        values = self.values
         try:
-            low = clean_size_string(parts[0])
-            high = clean_size_string(parts[1])
-            if low and high:
-                return round((low + high) / 2, 2)
-            return low or high
-        except:
-            return None
-
-    # Replace German decimal comma with dot
-    # Example: "31,36" -> "31.36"
-    try:
-        clean_str = clean_str.replace('.', '').replace(',', '.')
-        return float(clean_str)
-    except ValueError:
+            value = values.pop(raw)
+            self.hits += 1
+        except KeyError:
+            self.misses += 1
+            value = _parse_amount(raw)
+            self.unsaved[raw] = None
+        values[raw] = value  # (Re)inserted as most recently used
+        self._trim()
+        return value
+
+    def get_many(self, raws):
+        """Parses a set of distinct raw strings at once. Returns {raw: amount}."""
+        values = self.values
+        amounts = {raw: values.pop(raw) for raw in values.keys() & raws}
+        self.hits += len(amounts)
+        values.update(amounts)
+        parsed = {raw: _parse_amount(raw) for raw in raws - amounts.keys()}
+        self.misses += len(parsed)
+        self.unsaved.update(parsed)
+        values.update(parsed)
+        amounts.update(parsed)
+        self._trim()
+        return amounts
+
+    def load(self):
+        """Reads the cache saved by earlier runs (oldest entries first, so the LRU order survives).
+
+        Tables written by older parser versions are dropped.
+        """
+        conn = listing_store.connect()
+        with conn:
+            stale = [name for (name,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'parse_cache%' AND name != ?",
+                (PARSE_CACHE_TABLE,),
+            )]
+            for name in stale:
+                conn.execute(f"DROP TABLE {name}")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {PARSE_CACHE_TABLE} (raw TEXT PRIMARY KEY, value REAL)")
+        if stale:
+            print(f"🧮 Parser changed: dropped the old parse cache ({', '.join(stale)}).")
+        for raw, value in conn.execute(f"SELECT raw, value FROM {PARSE_CACHE_TABLE} ORDER BY rowid"):
+            self.values.setdefault(raw, value)
+        self._trim()
+        self.loaded = True
+
+    def clear(self):
+        """Forgets every cached result, in memory and in the database."""
+        self.values = {}
+        self.unsaved = {}
+        conn = listing_store.connect()
+        with conn:
+            conn.execute(f"DROP TABLE IF EXISTS {PARSE_CACHE_TABLE}")
+        self.loaded = False
+
+    def save(self):
+        """Inserts the entries parsed since the last save and drops the oldest rows beyond `size`."""
+        values = self.values
+        rows = [(raw, values[raw]) for raw in self.unsaved if raw in values]
+        conn = listing_store.connect()
+        with conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {PARSE_CACHE_TABLE} (raw TEXT PRIMARY KEY, value REAL)")
+            conn.executemany(f"INSERT OR REPLACE INTO {PARSE_CACHE_TABLE} (raw, value) VALUES (?, ?)", rows)
+            conn.execute(
+                f"DELETE FROM {PARSE_CACHE_TABLE} WHERE rowid < "
+                f"(SELECT rowid FROM {PARSE_CACHE_TABLE} ORDER BY rowid DESC LIMIT 1 OFFSET ?)",
+                (self.size - 1,),
+            )
+        self.unsaved = {}
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.values),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+        }
+
+    def print_stats(self):
+        stats = self.stats()
+        rate = f"{stats['hit_rate']:.1%}" if stats['hit_rate'] is not None else "n/a"
+        print(f"🧮 Parse cache: {stats['hits']} hits, {stats['misses']} misses (hit rate {rate}), {stats['entries']} entries")
+
+
+parse_cache = ParseCache()
+
+
+def parse_amount(value_str):
+    """Parses the numeric value of a card string as a float, or None (memoized in parse_cache).
+
+    '~' and units are ignored; a range like '860 - 1.300 €' gives the midpoint.
+    """
+    return parse_cache.get(value_str or '')
+
+
+def _to_money(value):
+    return int(value) if value is not None else None
+
+def _to_size(value):
+    return round(value, 2) if value is not None else None
+
+def _to_rooms(value):
+    if value is None:
         return None
+    # Return as int if it's a whole number (e.g., 2.0 -> 2), else float
+    if value.is_integer():
+        return int(value)
+    return value
+
+def clean_money_string(value_str):
+    """
+    Converts German currency strings (e.g., '1.099 €', '~880 €', '860 - 1.300 €') to integers.
+    Cents are dropped; ranges give the (truncated) average.
+    """
+    return _to_money(parse_amount(value_str))
+
+def clean_size_string(value_str):
+    """
+    Converts German size strings (e.g., '31,36 m²', '21,00 - 37,00 m²') to floats.
+    """
+    # '²' is not a digit, so the raw string can be parsed (and cached) as it is
+    return _to_size(parse_amount(value_str))
 
 def clean_rooms_string(value_str):
     """
-    Converts room strings (e.g., '1', '2,5') to floats.
+    Converts room strings (e.g., '1', '2,5') to floats, or ints for whole numbers.
     """
-    if not value_str or "N/A" in value_str:
-        return None
-    
-    try:
-        # Replace decimal comma with dot (e.g., "2,5" -> 2.5)
-        clean_str = value_str.replace(',', '.').strip()
-        # Remove any non-numeric chars except dot (just in case)
-        clean_str = re.sub(r'[^\d\.]', '', clean_str)
-        
-        val = float(clean_str)
-        
-        # Return as int if it's a whole number (e.g., 2.0 -> 2), else float
-        if val.is_integer():
-            return int(val)
-        return val
-    except ValueError:
-        return None
+    return _to_rooms(parse_amount(value_str))
 
-def process_listings():
-    try:
-        with open(INPUT_FILE, 'r', encoding='utf-8') as f:
-            listings = json.load(f)
-            
-        cleaned_count = 0
-        
-        for listing in listings:
-            # Process Cold Miete
-            listing['cold_miete_numeric'] = clean_money_string(listing.get('cold_miete', ''))
-            
-            # Process Warm Miete
-            listing['warm_miete_numeric'] = clean_money_string(listing.get('warm_miete', ''))
-            
-            # Process Size
-            listing['size_numeric'] = clean_size_string(listing.get('size_m2', ''))
-            
-            # Process Rooms
-            listing['rooms_numeric'] = clean_rooms_string(listing.get('rooms', ''))
-            
-            cleaned_count += 1
-
-        # Save to new file
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(listings, f, ensure_ascii=False, indent=4)
-            
-        print(f"✅ Successfully cleaned {cleaned_count} listings.")
-        print(f"💾 Saved to {OUTPUT_FILE}")
-        
-    except FileNotFoundError:
-        print(f"❌ Error: Could not find {INPUT_FILE}")
+# --- Which raw column feeds which numeric column, and how the parsed amount is converted ---
+NUMERIC_COLUMNS = {
+    'cold_miete_numeric': ('cold_miete', _to_money),
+    'warm_miete_numeric': ('warm_miete', _to_money),
+    'size_numeric': ('size_m2', _to_size),
+    'rooms_numeric': ('rooms', _to_rooms),
+}
+
+def clean_columns(listings):
+    """Columnar cleaning for large batches. Returns {numeric column: list of values} in listing order.
+
+    All distinct raw strings of all columns go through the parse cache in one call; each is then
+    converted once per converter (the two rent columns share one table) and mapped back onto the rows.
+    """
+    columns = {source: [listing.get(source) or '' for listing in listings] for source, _ in NUMERIC_COLUMNS.values()}
+    distinct = {source: set(values) for source, values in columns.items()}
+    amounts = parse_cache.get_many(set().union(*distinct.values()))
+    tables = {}  # converter -> {raw: converted value}
+    cleaned = {}
+    for target, (source, convert) in NUMERIC_COLUMNS.items():
+        table = tables.setdefault(convert, {})
+        table.update({raw: convert(amounts[raw]) for raw in distinct[source] - table.keys()})
+        cleaned[target] = list(map(table.__getitem__, columns[source]))
+    return cleaned
+
+def clean_listings(listings):
+    """Adds the numeric columns to every listing (in place) using the columnar cleaner."""
+    for target, values in clean_columns(listings).items():
+        for listing, value in zip(listings, values):
+            listing[target] = value
+    return listings
+
+def clean_listing(listing):
+    """Adds the numeric columns to a single listing (in place) and returns it."""
+    # Process Cold Miete
+    listing['cold_miete_numeric'] = clean_money_string(listing.get('cold_miete', ''))
+
+    # Process Warm Miete
+    listing['warm_miete_numeric'] = clean_money_string(listing.get('warm_miete', ''))
+
+    # Process Size
+    listing['size_numeric'] = clean_size_string(listing.get('size_m2', ''))
+
+    # Process Rooms
+    listing['rooms_numeric'] = clean_rooms_string(listing.get('rooms', ''))
+    return listing
+
+def process_listings(everything=False):
+    """Cleans every listing that is new or changed since the last run and upserts only those.
+
+    everything=True re-cleans the whole history (e.g. after a parser change) without the parse cache.
+    """
+    if everything:
+        parse_cache.clear()
+    if not parse_cache.loaded:
+        parse_cache.load()
+    if everything:
+        listings = listing_store.fetch_listings(stage='tagged')
+    else:
+        listings = listing_store.load_pending('cleaned')
+    if not listings:
+        print("Nothing new to clean.")
+        return
+
+    clean_listings(listings)
+    cleaned_count = len(listings)
+
+    listing_store.upsert_listings(listings, 'cleaned')
+    parse_cache.save()
+
+    # Refresh the legacy file for older scripts
+    listing_store.export_json([OUTPUT_FILE])
+
+    print(f"✅ Successfully cleaned {cleaned_count} listings.")
+    print(f"💾 Saved to {listing_store.STORE_FILE}")
+    parse_cache.print_stats()
 
 if __name__ == '__main__':
-    process_listings()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Convert rent, size and room strings into numbers.")
+    parser.add_argument("--all", action="store_true", help="Re-clean every tagged listing, not only new or changed ones")
+    args = parser.parse_args()
+    process_listings(everything=args.all)
@@ -1,217 +1,522 @@
 # detail_scraper.py (Robust Full Enrichment Version)
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
-import time
-import random
-import json
 import re
 import atexit # <--- NEW: For saving on exit
 import sys    # <--- NEW: For catching interrupt signals
+import argparse
+import queue
+import threading
+from html.parser import HTMLParser
+import requests
+from requests.adapters import HTTPAdapter
+import listing_store
+from browser_session import initialize_driver, SessionPool, CHROME_DEBUGGER_ADDRESS
+from rate_limiter import AdaptivePacer, looks_blocked
 
 # --- File Definitions ---
-LISTINGS_SOURCE_FILE = "initial_scrape_state.json"       # File to read the initial data from
 LISTINGS_ENRICHED_FILE = "listings_enriched.json" # File to read/write the enriched data to
 
 # --- MAPPING: The order of the main criteria fields to extract ---
 FIELD_ORDER = ['cold_miete', 'rooms', 'size_m2', 'warm_miete']
 ENRICHED_FIELDS = set(FIELD_ORDER)
 
+# --- Worker Pool Settings ---
+SAVE_EVERY = 10                          # Writer checkpoints the enriched file after this many results
+
+# --- HTTP Fast Path Settings ---
+HTTP_TIMEOUT = 15       # Seconds per expose request before falling back to the browser
+HTTP_POOL_SIZE = 8      # Keep-alive connections kept open per host
+
 # --- Global state to hold and save data ---
 current_listings = []
 driver = None
 
-# --- Dependency from scraper.py (or define it here) ---
-def initialize_driver():
-    """Initializes and returns a Chrome WebDriver configured to look more human."""
-    global driver
-    options = webdriver.ChromeOptions()
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option('useAutomationExtension', False)
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
-    return driver
-# ----------------------------------------------------------------
-
 def load_listings():
-    """Loads initial data AND pre-existing enriched data for skipping."""
+    """Loads the listings that still need enrichment from the listing store.
+
+    On the first run the JSON files of the previous pipeline are imported into the store.
+    """
     global current_listings
-    
-    # 1. Load initial listings
-    try:
-        with open(LISTINGS_SOURCE_FILE, 'r', encoding='utf-8') as f:
-            # --- CHANGE 1: Load the entire dictionary ---
-            initial_listings_dict = json.load(f).get('listings', {})
-            print(f"Loaded {len(initial_listings_dict)} listings from {LISTINGS_SOURCE_FILE}.")
-    except Exception as e:
-        print(f"❌ Error loading initial data from {LISTINGS_SOURCE_FILE}: {e}")
-        return []
 
-    # 2. Load enriched listings (if the file exists) to create a map for skipping
-    enriched_map = {}
-    try:
-        with open(LISTINGS_ENRICHED_FILE, 'r', encoding='utf-8') as f:
-            existing_enriched = json.load(f)
-            # We assume enriched listings are saved as a list of dictionaries.
-            # Create map using the link's OBID (last segment) for consistent keying.
-            enriched_map = {item['link'].split('/')[-1]: item for item in existing_enriched}
-            print(f"Loaded {len(enriched_map)} existing enriched listings for skip check.")
-    except (FileNotFoundError, json.JSONDecodeError):
-        pass # File not found or corrupt, start fresh map
-
-    # 3. Merge: Use existing enriched data if available, otherwise use initial data.
-    # --- CHANGE 2: Iterate over the values of the dictionary ---
-    final_list = []
-    for obid, listing_data in initial_listings_dict.items():
-        # Use the OBID as the key for the map lookup
-        if obid in enriched_map:
-            final_list.append(enriched_map[obid]) # Use the enriched version
-        else:
-            final_list.append(listing_data) # Use the raw version
-            
-    current_listings = final_list
+    current_listings = listing_store.load_pending('enriched')
+    print(f"Loaded {len(current_listings)} listings pending enrichment from {listing_store.STORE_FILE}.")
     return current_listings
 
-def save_listings():
-    """Saves the current global state of listings to the ENRICHED JSON file."""
-    global current_listings
-    if not current_listings:
+def save_listings(listings=None):
+    """Upserts listings (default: the current working set) into the listing store."""
+    listings = current_listings if listings is None else listings
+    if not listings:
         print("⚠️ No listings to save.")
         return
-        
+
     try:
-        with open(LISTINGS_ENRICHED_FILE, 'w', encoding='utf-8') as f:
-            json.dump(current_listings, f, ensure_ascii=False, indent=4)
-        print(f"\n✅ Listings successfully saved to {LISTINGS_ENRICHED_FILE}")
+        listing_store.upsert_listings(listings, 'enriched', done=lambda l: not needs_enrichment(l))
+        print(f"\n✅ {len(listings)} listings saved to {listing_store.STORE_FILE}")
     except Exception as e:
-        print(f"❌ Failed to save updated listings to JSON: {e}")
+        print(f"❌ Failed to save updated listings to the store: {e}")
+
+def export_listings():
+    """Saves the working set and refreshes the ENRICHED JSON file for older scripts."""
+    save_listings()
+    listing_store.export_json([LISTINGS_ENRICHED_FILE])
 
-# Register save_listings to run when the program terminates (for persistence)
-atexit.register(save_listings)
+# Register export_listings to run when the program terminates (for persistence)
+atexit.register(export_listings)
 
 def is_fully_enriched(listing):
     """Checks if all target fields are present and not 'N/A'."""
     return all(listing.get(field) not in [None, 'N/A', '', 'N/A (Detail Missing)'] for field in ENRICHED_FIELDS)
 
 
-def scrape_details(listings):
-    """Navigates to each listing URL and scrapes missing details."""
+# --- Per-listing status codes returned by enrich_listing ---
+ENRICHED = "ENRICHED"
+NO_OFFER = "NO_OFFER"
+BLOCKED = "BLOCKED"
+FAILED = "FAILED"       # Page loaded but could not be read (timeout, layout change); skipped this run
+FALLBACK = "FALLBACK"   # HTTP fast path could not read the page; use the browser
+
+CRITERIA_CONTAINER_SELECTOR = "div.criteriagroup.flex.flex--wrap.main-criteria-container"
+MAIN_CRITERIA_ELEMENT_SELECTOR = "div.mainCriteria.flex-item"
+NO_OFFER_SELECTOR = "div.status-message.status-warning.margin-top-l" # <-- NEW SELECTOR
+
+
+def is_blocked(driver):
+    """True when the current page is a CAPTCHA or an access-denied page."""
+    return looks_blocked(driver.current_url, driver.title)
+
+
+def enrich_listing(driver, listing, label):
+    """Loads a single expose page and writes the main criteria into the listing dict.
+
+    Returns (status, extracted_count). The caller paces requests and decides what to do on BLOCKED.
+    """
+    url = listing['link']
+    updated_count = 0
+    print(f"\nProcessing listing {label}: {url}")
+    driver.get(url)
+
+    # --- NEW: CHECK FOR NO OFFER FOUND ---
+    try:
+        # Use a very short explicit wait here to confirm the element is not immediately available,
+        # which can help distinguish between an active listing and a slow-loading error page.
+
+        # We expect the No Offer message to load quickly if it's present.
+        WebDriverWait(driver, 3).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, NO_OFFER_SELECTOR))
+        )
+
+        # If the wait succeeds, the element is found:
+        listing['status'] = 'NO_OFFER_FOUND'
+        print(f"🛑 Listing {label} marked as 'No offer found'. Skipping extraction.")
+        return NO_OFFER, updated_count
+
+    except TimeoutException:
+        # This is the expected path for an ACTIVE listing (element not found in 3 seconds). Proceed normally.
+        print("DEBUG: Status element not found within 3s. Listing assumed active. Proceeding to criteria extraction.")
+        pass
+
+    except Exception as e:
+        # Catch any unexpected error *during the check itself* (e.g., driver error, network issue)
+        print(f"DEBUG ERROR: Unexpected error during 'No Offer Found' check: {e}")
+        print("Continuing to criteria extraction, but check logs for persistent errors.")
+        pass
+
+    # --- 2. ENRICHMENT LOGIC ---
+    try:
+        # 1. Wait for the main criteria container to load
+        criteria_container = WebDriverWait(driver, 15).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, CRITERIA_CONTAINER_SELECTOR))
+        )
+
+        # 2. Find all individual main criteria blocks
+        main_criteria_elements = criteria_container.find_elements(By.CSS_SELECTOR, MAIN_CRITERIA_ELEMENT_SELECTOR)
+
+        criteria_to_process = main_criteria_elements[:4]
+
+        # 3. Extract values based on field order
+        for index, element in enumerate(criteria_to_process):
+            field_name = FIELD_ORDER[index]
+
+            try:
+                value_div = element.find_element(By.CSS_SELECTOR, "div.is24-value.font-heading-medium-bold")
+                value_text = value_div.text.strip()
+
+                listing[field_name] = value_text
+                updated_count += 1
+                print(f"✅ Extracted {field_name}: {value_text}")
+
+            except Exception as e:
+                listing[field_name] = listing.get(field_name, "N/A (Detail Missing)")
+                continue
+
+        cleanup_card_fields(listing)
+
+    except Exception as e:
+        # Handle CAPTCHA/Timeout/CRITICAL errors that prevent processing the page
+        print(f"❌ CRITICAL ERROR processing page {url}: {e}")
+
+        if is_blocked(driver):
+             print("🚨 CAPTCHA detected. Manual intervention required.")
+             return BLOCKED, updated_count
+
+        # Not a block (e.g. timeout or changed layout): skip this listing, keep going
+        return FAILED, updated_count
+
+    return ENRICHED, updated_count
+
+
+def cleanup_card_fields(listing):
+    """Drops the search-card fields that the detail criteria supersede."""
+    if 'price' in listing:
+        del listing['price']
+    if 'size_m2' in listing and listing.get('size_m2') == 'N/A':
+        del listing['size_m2']
+
+
+# --- HTTP Fast Path ---
+
+def create_http_session():
+    """Returns a pooled keep-alive requests session that looks like the browser."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "de-DE,de;q=0.9,en;q=0.8",
+        "Accept-Encoding": "gzip, deflate",
+    })
+    return session
+
+
+class ExposeCriteriaParser(HTMLParser):
+    """Reads the main criteria values and the no-offer banner out of static expose HTML.
+
+    Mirrors the browser path: inside the main-criteria container, every mainCriteria block
+    contributes the text of its first is24-value div, in page order.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.values = []
+        self.found_container = False
+        self.no_offer = False
+        self.title = ""
+        self._depth = 0            # Current <div> nesting depth
+        self._container_depth = None
+        self._block_depth = None
+        self._value_depth = None
+        self._value_parts = []
+        self._block_has_value = False
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+            return
+        if tag != "div":
+            return
+        self._depth += 1
+        classes = set((dict(attrs).get("class") or "").split())
+
+        if {"status-message", "status-warning"} <= classes:
+            self.no_offer = True
+        if self._container_depth is None and {"criteriagroup", "main-criteria-container"} <= classes:
+            self._container_depth = self._depth
+            self.found_container = True
+        elif self._container_depth is not None and self._block_depth is None and "mainCriteria" in classes:
+            self._block_depth = self._depth
+            self._block_has_value = False
+        elif self._block_depth is not None and not self._block_has_value and "is24-value" in classes:
+            self._value_depth = self._depth
+            self._value_parts = []
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+            return
+        if tag != "div":
+            return
+        if self._value_depth == self._depth:
+            self.values.append(" ".join("".join(self._value_parts).split()))
+            self._value_depth = None
+            self._block_has_value = True
+        if self._block_depth == self._depth:
+            self._block_depth = None
+        if self._container_depth == self._depth:
+            self._container_depth = None
+        self._depth -= 1
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        if self._value_depth is not None:
+            self._value_parts.append(data)
+
+
+def fetch_details_http(session, listing, label):
+    """Enriches a listing from static HTML with a single HTTP round trip.
+
+    Returns (status, extracted_count). BLOCKED (CAPTCHA / access denied) and FALLBACK (request
+    failed, or the criteria block is rendered by JavaScript) both hand the page to the browser.
+    """
+    url = listing['link']
+    print(f"\n⚡ Fetching listing {label} over HTTP: {url}")
+    try:
+        response = session.get(url, timeout=HTTP_TIMEOUT)
+    except requests.RequestException as e:
+        print(f"   HTTP fetch failed ({e}). Falling back to browser.")
+        return FALLBACK, 0
+
+    if response.status_code in (403, 429) or "captcha" in response.url.lower():
+        print(f"   HTTP {response.status_code} / blocked page. Falling back to browser.")
+        return BLOCKED, 0
+    if response.status_code != 200:
+        print(f"   HTTP {response.status_code}. Falling back to browser.")
+        return FALLBACK, 0
+
+    parser = ExposeCriteriaParser()
+    parser.feed(response.text)
+    parser.close()
+
+    if looks_blocked(response.url, parser.title):
+        print("   Access denied page. Falling back to browser.")
+        return BLOCKED, 0
+
+    if parser.no_offer and not parser.found_container:
+        listing['status'] = 'NO_OFFER_FOUND'
+        print(f"🛑 Listing {label} marked as 'No offer found'. Skipping extraction.")
+        return NO_OFFER, 0
+
+    if not parser.values:
+        print("   Criteria block not in static HTML. Falling back to browser.")
+        return FALLBACK, 0
+
+    updated_count = 0
+    for field_name, value_text in zip(FIELD_ORDER, parser.values[:4]):
+        listing[field_name] = value_text
+        updated_count += 1
+        print(f"✅ Extracted {field_name}: {value_text}")
+    for field_name in FIELD_ORDER[len(parser.values):]:
+        listing[field_name] = listing.get(field_name, "N/A (Detail Missing)")
+
+    cleanup_card_fields(listing)
+    return ENRICHED, updated_count
+
+
+def process_listing(listing, label, pacer, http, get_driver):
+    """Enriches one listing: HTTP fast path first, browser only if needed. Both requests are paced.
+
+    get_driver is called lazily, so Chrome only starts once a page actually needs it.
+    """
+    url = listing['link']
+    if http:
+        pacer.wait(url)
+        status, extracted = fetch_details_http(http, listing, label)
+        pacer.report(url, blocked=status == BLOCKED)
+        if status not in (FALLBACK, BLOCKED):
+            return status, extracted
+
+    browser = get_driver()
+    pacer.wait(url)
+    status, extracted = enrich_listing(browser, listing, label)
+    pacer.report(url, blocked=status == BLOCKED)
+    return status, extracted
+
+
+def needs_enrichment(listing):
+    """False for listings that are already complete or known to be offline."""
+    return not is_fully_enriched(listing) and listing.get('status') != 'NO_OFFER_FOUND'
+
+
+def scrape_details(listings, use_http=True):
+    """Navigates to each listing URL and scrapes missing details.
+
+    With use_http, pages are fetched over plain HTTP first and Chrome is only started
+    for pages that need it.
+    """
     global driver
     updated_count = 0
+    http = create_http_session() if use_http else None
+    pacer = AdaptivePacer('detail')
+
+    def get_driver():
+        global driver
+        if driver is None:
+            # The sequential run is the only browser session, so it may use a running Chrome
+            driver = initialize_driver(profile="detail", attach=CHROME_DEBUGGER_ADDRESS)
+        return driver
 
-    CRITERIA_CONTAINER_SELECTOR = "div.criteriagroup.flex.flex--wrap.main-criteria-container"
-    MAIN_CRITERIA_ELEMENT_SELECTOR = "div.mainCriteria.flex-item"
-    NO_OFFER_SELECTOR = "div.status-message.status-warning.margin-top-l" # <-- NEW SELECTOR
-    
     # Use a try...finally block to ensure the driver is quit and data is saved
     try:
-        driver = initialize_driver()
-        
         for i, listing in enumerate(listings):
-            
+
             # --- 1. SKIP LOGIC ---
             if is_fully_enriched(listing):
                 print(f"Skipping listing {i+1}/{len(listings)} (Already fully enriched)")
                 continue
-            
+
             # Skip if already marked as not found
             if listing.get('status') == 'NO_OFFER_FOUND':
                 print(f"Skipping listing {i+1}/{len(listings)} (Previously marked as not found)")
                 continue
 
-            url = listing['link']
-            print(f"\nProcessing listing {i+1}/{len(listings)}: {url}")
-            driver.get(url)
-            
-            # ⏱️ Human-like wait after loading the detail page
-            time.sleep(random.uniform(3, 6))
-            
-            # --- NEW: CHECK FOR NO OFFER FOUND ---
-            try:
-                # Use a very short explicit wait here to confirm the element is not immediately available,
-                # which can help distinguish between an active listing and a slow-loading error page.
-                
-                # We expect the No Offer message to load quickly if it's present.
-                WebDriverWait(driver, 3).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, NO_OFFER_SELECTOR))
-                )
-                
-                # If the wait succeeds, the element is found:
-                listing['status'] = 'NO_OFFER_FOUND'
-                print(f"🛑 Listing {i+1} marked as 'No offer found'. Skipping extraction.")
-                continue # Move to the next listing
-                
-            except TimeoutException:
-                # This is the expected path for an ACTIVE listing (element not found in 3 seconds). Proceed normally.
-                print("DEBUG: Status element not found within 3s. Listing assumed active. Proceeding to criteria extraction.")
-                pass 
-                
-            except Exception as e:
-                # Catch any unexpected error *during the check itself* (e.g., driver error, network issue)
-                print(f"DEBUG ERROR: Unexpected error during 'No Offer Found' check: {e}")
-                print("Continuing to criteria extraction, but check logs for persistent errors.")
-                pass
-            
-            # --- 2. ENRICHMENT LOGIC ---
-            # ... (rest of the scraping code remains the same) ...
-            try:
-                # 1. Wait for the main criteria container to load
-                criteria_container = WebDriverWait(driver, 15).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, CRITERIA_CONTAINER_SELECTOR))
-                )
-                
-                # 2. Find all individual main criteria blocks
-                main_criteria_elements = criteria_container.find_elements(By.CSS_SELECTOR, MAIN_CRITERIA_ELEMENT_SELECTOR)
-                
-                criteria_to_process = main_criteria_elements[:4]
-                
-                # 3. Extract values based on field order
-                for index, element in enumerate(criteria_to_process):
-                    field_name = FIELD_ORDER[index]
-                    
-                    try:
-                        value_div = element.find_element(By.CSS_SELECTOR, "div.is24-value.font-heading-medium-bold")
-                        value_text = value_div.text.strip()
-                        
-                        listing[field_name] = value_text
-                        updated_count += 1
-                        print(f"✅ Extracted {field_name}: {value_text}")
-                            
-                    except Exception as e:
-                        listing[field_name] = listing.get(field_name, "N/A (Detail Missing)")
-                        continue
-                
-                # Clean up original fields
-                if 'price' in listing:
-                    del listing['price']
-                if 'size_m2' in listing and listing.get('size_m2') == 'N/A':
-                    del listing['size_m2']
-                
-            except Exception as e:
-                # Handle CAPTCHA/Timeout/CRITICAL errors that prevent processing the page
-                print(f"❌ CRITICAL ERROR processing page {url}: {e}")
-                
-                if "captcha" in driver.current_url.lower():
-                     print("🚨 CAPTCHA detected. Manual intervention required.")
-                
-                break 
+            status, extracted = process_listing(listing, f"{i+1}/{len(listings)}", pacer, http, get_driver)
+            updated_count += extracted
+            if status == BLOCKED:
+                break
+            if status == FAILED:
+                continue
+            save_listings([listing])
 
     finally:
         # This block ALWAYS executes
         if driver:
             driver.quit()
+        if http:
+            http.close()
+        pacer.print_stats()
         print(f"\n--- Detail Scrape Finished. Total extracted data points updated in this session: {updated_count} ---")
-        
+
     return listings
-    
+
+
+# --- Worker Pool Mode ---
+
+def _result_writer(listings, results, total):
+    """Single writer thread: applies worker results to the shared list and upserts them in batches."""
+    done = 0
+    batch = []
+    while True:
+        item = results.get()
+        if item is None:
+            break
+        index, enriched = item
+        listings[index] = enriched
+        batch.append(enriched)
+        done += 1
+        if len(batch) >= SAVE_EVERY:
+            save_listings(batch)
+            batch = []
+            print(f"💾 Writer checkpoint: {done}/{total} listings processed.")
+    if batch:
+        save_listings(batch)
+
+
+def _worker_loop(worker_id, work, results, console_lock, stats, use_http, pool):
+    """Pulls listings from the shared queue with its own sessions until the queue is empty."""
+    name = f"W{worker_id}"
+    pacer = AdaptivePacer('detail')   # Own budget per worker
+    http = create_http_session() if use_http else None
+    worker_driver = None
+
+    def get_driver():
+        nonlocal worker_driver
+        if worker_driver is None:
+            worker_driver = pool.acquire()
+        return worker_driver
+
+    try:
+        while True:
+            try:
+                index, listing = work.get_nowait()
+            except queue.Empty:
+                break
+
+            # Work on a copy; only the writer thread touches the shared list
+            listing = dict(listing)
+            label = f"{index+1} [{name}]"
+            status, extracted = process_listing(listing, label, pacer, http, get_driver)
+
+            if status == BLOCKED:
+                # Pause only this worker; the other sessions keep going
+                with console_lock:
+                    print(f"🚨 [{name}] CAPTCHA or access denied. Solve it in this worker's browser window.")
+                    input(f"[{name}] Press ENTER after solving CAPTCHA...")
+                if is_blocked(worker_driver):
+                    print(f"🛑 [{name}] CAPTCHA persists. Returning listing to the queue and stopping this worker.")
+                    work.put((index, listing))
+                    break
+                pacer.wait(listing['link'])
+                status, extracted = enrich_listing(worker_driver, listing, label)
+                pacer.report(listing['link'], blocked=status == BLOCKED)
+                if status == BLOCKED:
+                    work.put((index, listing))
+                    break
+
+            stats[worker_id] += extracted
+            if status == FAILED:
+                print(f"⚠️ [{name}] Could not read listing {index+1}. Skipping it this run.")
+                continue
+            results.put((index, listing))
+    except Exception as e:
+        print(f"❌ [{name}] Worker crashed: {e}")
+    finally:
+        if worker_driver:
+            pool.release(worker_driver)
+        if http:
+            http.close()
+        with console_lock:
+            print(f"[{name}] pacing:")
+            pacer.print_stats()
+
+
+def scrape_details_parallel(listings, workers, use_http=True):
+    """Enriches listings with a pool of independent browser sessions sharing one work queue."""
+    work = queue.Queue()
+    for index, listing in enumerate(listings):
+        if needs_enrichment(listing):
+            work.put((index, listing))
+
+    total = work.qsize()
+    print(f"🚀 Starting {workers} workers for {total} listings ({len(listings) - total} skipped).")
+    if not total:
+        return listings
+
+    results = queue.Queue()
+    console_lock = threading.Lock()
+    stats = [0] * workers
+    pool = SessionPool(workers, prefix="detail_worker")
+
+    writer = threading.Thread(target=_result_writer, args=(listings, results, total))
+    writer.start()
+
+    threads = [
+        threading.Thread(target=_worker_loop, args=(n, work, results, console_lock, stats, use_http, pool), daemon=True)
+        for n in range(workers)
+    ]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        results.put(None)
+        writer.join()
+        pool.close_all()
+        print(f"\n--- Parallel Detail Scrape Finished. Data points per worker: {stats} (total {sum(stats)}) ---")
+        if not work.empty():
+            print(f"⚠️ {work.qsize()} listings left unprocessed (all workers stopped). Rerun to continue.")
+
+    return listings
+
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Enrich scraped listings with detail page data.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of parallel browser sessions (default: 1)")
+    parser.add_argument("--browser-only", action="store_true", help="Skip the plain-HTTP fast path and render every page in Chrome")
+    args = parser.parse_args()
+    use_http = not args.browser_only
+
     listings = load_listings()
     if listings:
         # The main work happens inside scrape_details, and saving is managed by atexit.
-        scrape_details(listings)
\ No newline at end of file
+        if args.workers > 1:
+            scrape_details_parallel(listings, args.workers, use_http)
+        else:
+            scrape_details(listings, use_http)
\ No newline at end of file
@@ -3,7 +3,8 @@
 import json
 import re
 from typing import List, Dict
-from berlin_zip_map import BERLIN_ZIP_MAP
+from berlin_zip_map import lookup_zip, bezirk_for
+import listing_store
 
 # --- File Definitions ---
 LISTINGS_SOURCE_FILE = "listings_enriched.json"
@@ -19,12 +20,43 @@ BERLIN_DISTRICT_NAMES = [
     "Altglienicke", "Johannisthal", "Rahnsdorf", "Staaken", "Buckow", "Gropiusstadt",
     "Halensee", "Weißensee", "Baumschulenweg", "Friedrichsfelde", "Neu-Hohenschönhausen",
     "Alt-Hohenschönhausen", "Lankwitz", "Heinersdorf", "Lichterfelde", "Friedenau", "Schmargendorf",
-    "Gesundbrunnen", "Wilhelmstadt", "Haselhorst", "Siemensstadt", "Alt-Treptow", "Karlshorst", "Staaken",
+    "Gesundbrunnen", "Wilhelmstadt", "Haselhorst", "Siemensstadt",
     "Grünau", "Dahlem", "Wannsee", "Tegel", "Oberschöneweide", "Rudow", "Niederschöneweide", "Mariendorf", 
     "Wittenau", "Marienfelde", "Britz", "Lichtenrade", "Westend", "Adlershof", "Plänterwald"
 ]
 DISTRICT_LOWER_MAP = {d.lower(): d for d in BERLIN_DISTRICT_NAMES}
 
+
+def _trie_pattern(words):
+    """Builds a regex from a character trie of `words`, so each position is checked in one walk.
+
+    A word that is a prefix of another becomes an optional tail, which the regex tries first:
+    at any position the longest name wins ("Alt-Treptow" over "Alt...", "Neu-Hohenschönhausen" over shorter names).
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        ends_here = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if ends_here:
+            return f'(?:{body})?'
+        return body
+
+    return build(trie)
+
+
+# One pass over the address finds every district mention; a name must not be part of a longer word
+# ("Spandauer Damm" is not Spandau), but may follow a hyphen ("Alt-Moabit" mentions Moabit).
+DISTRICT_REGEX = re.compile(r'(?<!\w)' + _trie_pattern(DISTRICT_LOWER_MAP) + r'(?!\w)', re.IGNORECASE)
+
 def load_listings(file_path: str) -> List[Dict]:
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
@@ -33,48 +65,51 @@ def load_listings(file_path: str) -> List[Dict]:
         print(f"❌ Error loading listings: {e}")
         return []
 
+# Regex to find a 5-digit number starting with 10, 12, 13, or 14 (Berlin ranges)
+ZIP_REGEX = re.compile(r'\b(1[0-4]\d{3})\b')
+
+def find_district(address: str):
+    """Returns the district for a single address, or None if nothing matched."""
+    found_district = None
+
+    # --- STRATEGY A: Name Matching ---
+    # Addresses read "street, ZIP city, Ortsteil", so the last mention is the most specific one
+    # and a district name inside the street ("Alt-Moabit 5, ..., Tiergarten") loses to it.
+    for match in DISTRICT_REGEX.finditer(address):
+        found_district = DISTRICT_LOWER_MAP[match.group().lower()]
+
+    # --- STRATEGY B: ZIP Code Fallback ---
+    if not found_district:
+        match = ZIP_REGEX.search(address)
+        if match:
+            # A ZIP can span several Ortsteile; the table lists the main one first
+            candidates = lookup_zip(match.group(1))
+            if candidates:
+                found_district = candidates[0][0]
+
+    return found_district
+
+def tag_listing(listing: Dict) -> bool:
+    """Sets listing['district'] (Ortsteil) and listing['bezirk'] in place. Returns True if a district was found."""
+    found_district = find_district(listing.get('address', ''))
+    if found_district:
+        listing['district'] = found_district
+        listing['bezirk'] = bezirk_for(found_district)
+        return True
+    listing['district'] = "N/A (District Not Found)"
+    listing['bezirk'] = None
+    return False
+
 def tag_listings_with_district(listings: List[Dict]) -> tuple[List[Dict], int]:
     tagged_count = 0
     untagged_listings = []
-    
-    # Regex to find a 5-digit number starting with 10, 12, 13, or 14 (Berlin ranges)
-    zip_regex = re.compile(r'\b(1[0-4]\d{3})\b')
 
     for listing in listings:
-        address = listing.get('address', '')
-        address_lower = address.lower()
-        found_district = None
-        
-        # --- STRATEGY A: Name Matching (Existing Logic) ---
-        for lower_name, proper_name in DISTRICT_LOWER_MAP.items():
-            if address_lower.startswith(lower_name):
-                end_index = len(lower_name)
-                if end_index == len(address_lower) or address_lower[end_index] in [',', ' ', '(', '-']:
-                    found_district = proper_name
-                    break
-            if f" {lower_name}" in address_lower or f",{lower_name}" in address_lower:
-                found_district = proper_name
-                break
-        
-        # --- STRATEGY B: ZIP Code Fallback (New Logic) ---
-        if not found_district:
-            match = zip_regex.search(address)
-            if match:
-                zip_code = match.group(1)
-                # Look up the ZIP in our static map
-                found_district = BERLIN_ZIP_MAP.get(zip_code)
-                if found_district:
-                    # Optional: Add a debug print to see it working
-                    # print(f"📍 ZIP Match: {zip_code} -> {found_district}")
-                    pass
-
         # --- Final Assignment ---
-        if found_district:
-            listing['district'] = found_district
+        if tag_listing(listing):
             tagged_count += 1
         else:
-            listing['district'] = "N/A (District Not Found)"
-            untagged_listings.append(address)
+            untagged_listings.append(listing.get('address', ''))
 
     # Debug Report
     if untagged_listings:
@@ -86,15 +121,19 @@ def tag_listings_with_district(listings: List[Dict]) -> tuple[List[Dict], int]:
     return listings, tagged_count
 
 def save_listings(listings: List[Dict]):
+    """Upserts the tagged listings into the store and refreshes the legacy JSON file."""
     try:
-        with open(LISTINGS_OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(listings, f, ensure_ascii=False, indent=4)
-        print(f"\n✅ Saved to {LISTINGS_OUTPUT_FILE}")
+        listing_store.upsert_listings(listings, 'tagged')
+        print(f"\n✅ Saved {len(listings)} tagged listings to {listing_store.STORE_FILE}")
     except Exception as e:
         print(f"❌ Save failed: {e}")
+        return
+    listing_store.export_json([LISTINGS_OUTPUT_FILE])
 
 if __name__ == '__main__':
-    data = load_listings(LISTINGS_SOURCE_FILE)
+    data = listing_store.load_pending('tagged')
+    if not data:
+        print("Nothing new to tag.")
     if data:
         tagged_data, count = tag_listings_with_district(data)
         save_listings(tagged_data)
@@ -1,4 +1,10 @@
+import argparse
+import bisect
 import json
+import re
+
+import listing_store
+from berlin_zip_map import bezirk_for
 
 # ==========================================
 # 🎛️ YOUR FILTER SETTINGS (EDIT THESE)
@@ -11,16 +17,6 @@ OUTPUT_FILE = "filtered_results.json"
 # 2. Location Preferences
 # List the exact names of districts you want to see.
 # Leave list empty [] if you want to see ALL districts.
-TARGET_DISTRICTS = [
-    "Kreuzberg", 
-    "Neukölln", 
-    "Friedrichshain", 
-    "Mitte", 
-    "Prenzlauer Berg",
-    "Schöneberg",
-    "Tempelhof"
-]
-
 TARGET_DISTRICTS = [
     # --- Core / Trendy / Central ---
     "Kreuzberg",
@@ -47,7 +43,7 @@ TARGET_DISTRICTS = [
     
     # --- Nice Residential / Water / Green (S-Bahn Connected) ---
     "Pankow",
-    "Weissensee",
+    "Weißensee",
     "Treptow",
     "Alt-Treptow",
     "Plänterwald",
@@ -57,6 +53,10 @@ TARGET_DISTRICTS = [
     "Lichterfelde"
 ]
 
+# Whole boroughs (Bezirke), e.g. "Friedrichshain-Kreuzberg" or "Treptow-Köpenick".
+# A listing matches if its Ortsteil is in TARGET_DISTRICTS or its Bezirk is in TARGET_BEZIRKE.
+TARGET_BEZIRKE = []
+
 # 3. Price Preferences (Warm Miete)
 # Set to None if you don't want a limit.
 MAX_WARM_RENT = 1400  
@@ -69,9 +69,58 @@ MAX_SIZE = None # None means no upper limit
 # 5. Room Preferences
 MIN_ROOMS = 1
 
+# 6. More Profiles (optional)
+# A TOML file with one [profiles.<name>] table per search, using the keys of PROFILE_KEYS below,
+# e.g. districts = ["Kreuzberg"], max_warm_rent = 1200. Pass it with --profiles.
+
 # ==========================================
 
+# --- Settings a profile can set (anything left out falls back to the settings above) ---
+PROFILE_KEYS = ('districts', 'bezirke', 'min_warm_rent', 'max_warm_rent', 'min_size', 'max_size', 'min_rooms')
+
+# --- Numeric column -> (profile key for the lower bound, for the upper bound, rejection reasons) ---
+RANGE_COLUMNS = {
+    'warm_miete_numeric': ('min_warm_rent', 'max_warm_rent', "missing_data", "too_cheap", "too_expensive"),
+    'size_numeric': ('min_size', 'max_size', "missing_data", "too_small", "too_big"),
+    'rooms_numeric': ('min_rooms', None, "missing_rooms", "too_few_rooms", None),
+}
+
+def default_profile():
+    """The profile described by the settings at the top of this file."""
+    return {
+        'name': "default",
+        'districts': TARGET_DISTRICTS, 'bezirke': TARGET_BEZIRKE,
+        'min_warm_rent': MIN_WARM_RENT, 'max_warm_rent': MAX_WARM_RENT,
+        'min_size': MIN_SIZE, 'max_size': MAX_SIZE,
+        'min_rooms': MIN_ROOMS,
+    }
+
+def make_profile(name="default", **settings):
+    """A profile from keyword settings; keys that are not given fall back to the file settings."""
+    unknown = set(settings) - set(PROFILE_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown filter setting(s) in profile '{name}': {', '.join(sorted(unknown))}")
+    profile = default_profile()
+    profile.update(settings)
+    profile['name'] = name
+    profile['districts'] = set(profile['districts'] or ())
+    profile['bezirke'] = set(profile['bezirke'] or ())
+    return profile
+
+def load_profiles(path):
+    """Reads [profiles.<name>] tables from a TOML file."""
+    try:
+        import tomllib
+    except ImportError:  # Python < 3.11
+        import tomli as tomllib
+    with open(path, 'rb') as f:
+        data = tomllib.load(f)
+    return [make_profile(name, **settings) for name, settings in data.get('profiles', {}).items()]
+
 def load_data():
+    listing_store.import_legacy_once()
+    if listing_store.count_listings('cleaned'):
+        return listing_store.fetch_listings(stage='cleaned')
     try:
         with open(INPUT_FILE, 'r', encoding='utf-8') as f:
             return json.load(f)
@@ -79,77 +128,118 @@ def load_data():
         print(f"❌ Error: Could not find {INPUT_FILE}")
         return []
 
-def filter_and_sort(listings):
-    print(f"--- 🔍 Starting Filter Process on {len(listings)} listings ---")
-    
-    filtered_list = []
-    
-    # Statistics counters
-    stats = {
-        "wrong_district": 0,
-        "too_expensive": 0,
-        "too_small": 0,
-        "too_few_rooms": 0,
-        "missing_data": 0,
-        "kept": 0
-    }
+def rejection_reason(item, profile=None):
+    """Returns why a single listing fails the filter settings, or None if it matches."""
+    profile = profile or make_profile()
 
-    for item in listings:
-        # --- 1. District Filter ---
-        if TARGET_DISTRICTS: # Only check if list is not empty
-            if item.get('district') not in TARGET_DISTRICTS:
-                stats["wrong_district"] += 1
-                continue
-
-        # --- 2. Price Filter (Warm Miete) ---
-        price = item.get('warm_miete_numeric')
-        
-        # If Warm Miete is missing, we check if Cold Miete + buffer (e.g. 150) fits? 
-        # For now, let's be strict. If Warm Miete is missing, we skip (or you can decide to keep).
-        if price is None:
-            # Option: Skip if no price data
-            stats["missing_data"] += 1
-            continue
-            
-        if MAX_WARM_RENT and price > MAX_WARM_RENT:
-            stats["too_expensive"] += 1
-            continue
-        if MIN_WARM_RENT and price < MIN_WARM_RENT:
-            # Usually not an issue, but good for filtering out parking spots/errors
-            continue
-
-        # --- 3. Size Filter ---
-        size = item.get('size_numeric')
-        if size is None:
-            stats["missing_data"] += 1
-            continue
-        if MIN_SIZE and size < MIN_SIZE:
-            stats["too_small"] += 1
-            continue
-        if MAX_SIZE and size > MAX_SIZE:
-            continue
-
-        # --- 4. Room Filter ---
-        rooms = item.get('rooms_numeric')
-        if rooms is None:
-             # Assume 1 room if missing, or skip. Let's skip to be safe.
-             continue
-        if MIN_ROOMS and rooms < MIN_ROOMS:
-            stats["too_few_rooms"] += 1
-            continue
-
-        # If it passed all checks, keep it!
-        filtered_list.append(item)
-        stats["kept"] += 1
-
-    # --- Sorting Logic ---
-    # 1. Price (Ascending) -> Cheapest first
-    # 2. Rooms (Descending) -> If prices are equal, show more rooms first
-    
-    print("--- 🔄 Sorting results... ---")
-    filtered_list.sort(key=lambda x: (x['warm_miete_numeric'], -x.get('rooms_numeric', 0)))
+    # --- 1. District Filter (only if a list is not empty) ---
+    if profile['districts'] or profile['bezirke']:
+        district = item.get('district')
+        bezirk = item.get('bezirk') or bezirk_for(district)
+        if district not in profile['districts'] and bezirk not in profile['bezirke']:
+            return "wrong_district"
+
+    # --- 2. Price (Warm Miete), 3. Size, 4. Rooms ---
+    # A listing without the value is skipped rather than guessed
+    for column, (low_key, high_key, missing, too_low, too_high) in RANGE_COLUMNS.items():
+        value = item.get(column)
+        if value is None:
+            return missing
+        if profile[low_key] and value < profile[low_key]:
+            return too_low
+        if high_key and profile[high_key] and value > profile[high_key]:
+            return too_high
+
+    return None
+
+class ListingTable:
+    """Columnar, indexed view of the listings that any number of profiles can be queried against.
+
+    District and Bezirk get hash indexes (value -> row numbers); the numeric columns are kept as
+    sorted (value, row) arrays, so a range predicate is a bisect slice.
+    """
+
+    def __init__(self, listings):
+        self.listings = listings
+        self.all_rows = set(range(len(listings)))
+        self.by_district = {}
+        self.by_bezirk = {}
+        for row, item in enumerate(listings):
+            district = item.get('district')
+            self.by_district.setdefault(district, set()).add(row)
+            self.by_bezirk.setdefault(item.get('bezirk') or bezirk_for(district), set()).add(row)
+
+        self.columns = {}
+        self.sorted_values = {}
+        self.sorted_rows = {}
+        self.present = {}
+        for column in RANGE_COLUMNS:
+            self.columns[column] = [item.get(column) for item in listings]
+            pairs = sorted((value, row) for row, value in enumerate(self.columns[column]) if value is not None)
+            self.sorted_values[column] = [value for value, _ in pairs]
+            self.sorted_rows[column] = [row for _, row in pairs]
+            self.present[column] = set(self.sorted_rows[column])
+
+    def rows_in_range(self, column, low=None, high=None, within=None):
+        """Rows whose value in `column` lies within [low, high] (a missing bound is open).
+
+        within: only rows from this set are of interest. If it is smaller than the bisect slice,
+        its values are checked directly instead of materializing the slice.
+        """
+        values = self.sorted_values[column]
+        start = bisect.bisect_left(values, low) if low else 0
+        end = bisect.bisect_right(values, high) if high else len(values)
+        if within is not None and len(within) < end - start:
+            column_values = self.columns[column]
+            return {row for row in within if column_values[row] is not None
+                    and (not low or column_values[row] >= low) and (not high or column_values[row] <= high)}
+        return set(self.sorted_rows[column][start:end])
+
+    def query(self, profile):
+        """Returns (matching listings sorted like filter_and_sort, statistics) for one profile."""
+        stats = {reason: 0 for reason in ("wrong_district", "too_expensive", "too_small", "too_few_rooms", "missing_data")}
+        remaining = self.all_rows
 
-    return filtered_list, stats
+        # Predicates are applied in the same order as rejection_reason, so each listing is counted once
+        if profile['districts'] or profile['bezirke']:
+            in_area = set()
+            for district in profile['districts']:
+                in_area |= self.by_district.get(district, set())
+            for bezirk in profile['bezirke']:
+                in_area |= self.by_bezirk.get(bezirk, set())
+            remaining = self._narrow(remaining, in_area, "wrong_district", stats)
+
+        for column, (low_key, high_key, missing, too_low, too_high) in RANGE_COLUMNS.items():
+            remaining = self._narrow(remaining, self.present[column], missing, stats)
+            if profile[low_key]:
+                remaining = self._narrow(remaining, self.rows_in_range(column, low=profile[low_key], within=remaining), too_low, stats)
+            if high_key and profile[high_key]:
+                remaining = self._narrow(remaining, self.rows_in_range(column, high=profile[high_key], within=remaining), too_high, stats)
+
+        # 1. Price (Ascending) -> Cheapest first
+        # 2. Rooms (Descending) -> If prices are equal, show more rooms first
+        matches = sorted((self.listings[row] for row in remaining),
+                         key=lambda x: (x['warm_miete_numeric'], -(x.get('rooms_numeric') or 0)))
+        stats["kept"] = len(matches)
+        return matches, stats
+
+    @staticmethod
+    def _narrow(rows, allowed, reason, stats):
+        kept = rows & allowed
+        # Some rejections (too cheap, too big, no room count) are not tracked in the statistics
+        if reason in stats:
+            stats[reason] += len(rows) - len(kept)
+        return kept
+
+def filter_and_sort(listings, profile=None):
+    print(f"--- 🔍 Starting Filter Process on {len(listings)} listings ---")
+    return ListingTable(listings).query(profile or make_profile())
+
+def filter_profiles(listings, profiles):
+    """Runs many profiles over the same data: the table and its indexes are built only once."""
+    print(f"--- 🔍 Filtering {len(listings)} listings for {len(profiles)} profiles ---")
+    table = ListingTable(listings)
+    return {profile['name']: table.query(profile) for profile in profiles}
 
 def print_results(results, stats):
     print("\n" + "="*60)
@@ -174,17 +264,43 @@ def print_results(results, stats):
     print(f"   ❌ Too few rooms:  {stats['too_few_rooms']}")
     print(f"   ⚠️ Missing Data:   {stats['missing_data']}")
 
-def save_filtered_data(results):
+def save_filtered_data(results, output_file=OUTPUT_FILE):
     try:
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
+        with open(output_file, 'w', encoding='utf-8') as f:
             json.dump(results, f, ensure_ascii=False, indent=4)
-        print(f"\n💾 SUCCESS: Saved {len(results)} matches to {OUTPUT_FILE}")
+        print(f"\n💾 SUCCESS: Saved {len(results)} matches to {output_file}")
     except Exception as e:
         print(f"❌ Failed to save filtered results: {e}")
 
+def output_file_for(profile_name):
+    """filtered_results.json for the default profile, filtered_results_<name>.json for the others."""
+    if profile_name == "default":
+        return OUTPUT_FILE
+    slug = re.sub(r'[^\w-]+', '_', profile_name).strip('_')
+    return OUTPUT_FILE.replace(".json", f"_{slug}.json")
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Filter the cleaned listings by district, rent, size and rooms.")
+    parser.add_argument("--profiles", help="TOML file with [profiles.<name>] tables; every profile is run")
+    parser.add_argument("--districts", nargs="*", help="Ortsteile to keep (overrides TARGET_DISTRICTS; no names = all)")
+    parser.add_argument("--bezirke", nargs="*", help="Bezirke to keep (overrides TARGET_BEZIRKE)")
+    parser.add_argument("--min-warm-rent", type=int)
+    parser.add_argument("--max-warm-rent", type=int)
+    parser.add_argument("--min-size", type=float)
+    parser.add_argument("--max-size", type=float)
+    parser.add_argument("--min-rooms", type=float)
+    args = parser.parse_args()
+
+    if args.profiles:
+        profiles = load_profiles(args.profiles)
+    else:
+        overrides = {key: getattr(args, key) for key in PROFILE_KEYS if getattr(args, key) is not None}
+        profiles = [make_profile(**overrides)]
+
     data = load_data()
     if data:
-        matches, statistics = filter_and_sort(data)
-        print_results(matches, statistics)
-        save_filtered_data(matches)
\ No newline at end of file
+        for name, (matches, statistics) in filter_profiles(data, profiles).items():
+            if len(profiles) > 1:
+                print(f"\n######## Profile: {name} ########")
+            print_results(matches, statistics)
+            save_filtered_data(matches, output_file_for(name))
@@ -0,0 +1,250 @@
+# listing_store.py (SQLite-backed listing store shared by all pipeline stages)
+
+import json
+import sqlite3
+import sys
+import threading
+import time
+
+# --- File Definitions ---
+STORE_FILE = "listings.db"
+
+# --- Pipeline stages, in order. Every stage has a '<stage>_at' timestamp column. ---
+STAGES = ['scraped', 'enriched', 'tagged', 'cleaned']
+
+# --- Stage that must have run before a row is pending for the next one ---
+# (tagging only needs the address, so it does not wait for enrichment)
+PREREQUISITES = {'enriched': 'scraped', 'tagged': 'scraped', 'cleaned': 'tagged'}
+
+# --- Columns owned by each stage (what an upsert for that stage writes) ---
+STAGE_COLUMNS = {
+    'scraped': ['link', 'title', 'address', 'price', 'size_m2', 'rooms'],
+    'enriched': ['cold_miete', 'warm_miete', 'rooms', 'size_m2', 'price', 'status'],
+    'tagged': ['district', 'bezirk'],
+    'cleaned': ['cold_miete_numeric', 'warm_miete_numeric', 'size_numeric', 'rooms_numeric'],
+}
+
+# --- Column types (new entries are added to existing databases automatically) ---
+COLUMNS = {
+    'link': 'TEXT', 'title': 'TEXT', 'address': 'TEXT', 'price': 'TEXT', 'size_m2': 'TEXT', 'rooms': 'TEXT',
+    'cold_miete': 'TEXT', 'warm_miete': 'TEXT', 'status': 'TEXT',
+    'district': 'TEXT', 'bezirk': 'TEXT',
+    'cold_miete_numeric': 'INTEGER', 'warm_miete_numeric': 'INTEGER', 'size_numeric': 'REAL', 'rooms_numeric': 'REAL',
+}
+
+# --- Legacy JSON files the exporter keeps writing: filename -> (stage that must be done, columns) ---
+JSON_EXPORTS = {
+    "listings_data.json": ('scraped', STAGE_COLUMNS['scraped']),
+    "listings_enriched.json": ('scraped', None),
+    "listings_with_districts.json": ('tagged', None),
+    "listings_final_numeric.json": ('cleaned', None),
+}
+
+# --- Files of the JSON-based pipeline, imported once into the store: (filename, stage) ---
+LEGACY_SOURCES = [
+    ("initial_scrape_state.json", 'scraped'),   # The scraper's state: {'listings': {obid: listing}}
+    ("listings_data.json", 'scraped'),
+    ("listings_enriched.json", 'enriched'),
+    ("listings_with_districts.json", 'tagged'),
+    ("listings_final_numeric.json", 'cleaned'),
+]
+LEGACY_IMPORT_MARKER = 'legacy_json_imported'
+
+_local = threading.local()   # One connection per thread
+
+
+def obid_for(listing):
+    """Returns the ImmoScout object id of a listing (last segment of its link)."""
+    return listing['link'].rstrip('/').split('/')[-1]
+
+
+def _ensure_schema(conn):
+    stage_columns = ", ".join(f"{stage}_at REAL" for stage in STAGES)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS listings (obid TEXT PRIMARY KEY, {stage_columns})")
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(listings)")}
+    for column, column_type in COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE listings ADD COLUMN {column} {column_type}")
+    for stage in STAGES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_listings_{stage}_at ON listings ({stage}_at)")
+    # Store-wide flags, e.g. whether the legacy JSON files were imported
+    conn.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)")
+    conn.commit()
+
+
+def connect(path=None):
+    """Returns this thread's connection to the store, creating the schema on first use.
+
+    Pass a path to open a separate connection instead (e.g. for another database file).
+    """
+    if path is not None:
+        conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        _ensure_schema(conn)
+        return conn
+    if getattr(_local, 'connection', None) is None:
+        _local.connection = connect(STORE_FILE)
+    return _local.connection
+
+
+def _row_to_listing(row):
+    """Converts a database row back into the listing dict shape the scripts expect."""
+    listing = {}
+    for stage in STAGES:
+        done = row[f"{stage}_at"] is not None
+        for column in STAGE_COLUMNS[stage]:
+            value = row[column]
+            # Keep explicit None for numeric columns of a finished stage (matches the old JSON files)
+            if value is not None or (done and stage == 'cleaned'):
+                listing[column] = value
+    for column in COLUMNS:
+        if column not in listing and row[column] is not None:
+            listing[column] = row[column]
+    # When the card was last scraped with new content (used for freshness when ranking)
+    if row['scraped_at'] is not None:
+        listing['scraped_at'] = row['scraped_at']
+    return listing
+
+
+def upsert_listings(listings, stage, done=None, conn=None):
+    """Inserts or updates only the given listings, writing the columns owned by `stage`.
+
+    `done` is an optional predicate; listings for which it returns False are saved but
+    their stage timestamp is left untouched so they stay pending.
+    """
+    conn = conn or connect()
+    columns = STAGE_COLUMNS[stage]
+    stamp = f"{stage}_at"
+    now = time.time()
+
+    placeholders = ", ".join("?" for _ in columns)
+    updates = ", ".join(f"{c} = excluded.{c}" for c in columns)
+    sql = (
+        f"INSERT INTO listings (obid, {', '.join(columns)}, {stamp}) VALUES (?, {placeholders}, ?) "
+        f"ON CONFLICT(obid) DO UPDATE SET {updates}, {stamp} = COALESCE(excluded.{stamp}, listings.{stamp})"
+    )
+    rows = []
+    for listing in listings:
+        finished = done(listing) if done else True
+        rows.append((obid_for(listing), *[listing.get(c) for c in columns], now if finished else None))
+
+    with conn:
+        conn.executemany(sql, rows)
+    return len(rows)
+
+
+def reset_stage(obids, stage, conn=None):
+    """Clears the columns only `stage` writes (not an earlier stage too), so rows whose card
+    changed are redone from scratch instead of being skipped on their old values."""
+    conn = conn or connect()
+    earlier = {c for s in STAGES[:STAGES.index(stage)] for c in STAGE_COLUMNS[s]}
+    owned = [c for c in STAGE_COLUMNS[stage] if c not in earlier]
+    sql = f"UPDATE listings SET {', '.join(f'{c} = NULL' for c in owned)} WHERE obid = ?"
+    with conn:
+        conn.executemany(sql, [(obid,) for obid in obids])
+
+
+def fetch_listings(stage=None, pending=None, conn=None):
+    """Returns listings as dicts.
+
+    stage='tagged'   -> only rows that completed that stage.
+    pending='tagged' -> rows that are ready for that stage and still need it: never run,
+                        or an earlier stage has updated the row since.
+    """
+    conn = conn or connect()
+    where = []
+    if stage:
+        where.append(f"{stage}_at IS NOT NULL")
+    if pending:
+        earlier = STAGES[:STAGES.index(pending)]
+        stale = " OR ".join(f"{pending}_at < COALESCE({s}_at, 0)" for s in earlier)
+        where.append(f"{PREREQUISITES[pending]}_at IS NOT NULL")
+        where.append(f"({pending}_at IS NULL OR {stale})")
+    sql = "SELECT * FROM listings"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY scraped_at, obid"
+    return [_row_to_listing(row) for row in conn.execute(sql)]
+
+
+def count_listings(stage=None, conn=None):
+    """Number of rows in the store (optionally only those that completed `stage`)."""
+    conn = conn or connect()
+    sql = "SELECT COUNT(*) FROM listings"
+    if stage:
+        sql += f" WHERE {stage}_at IS NOT NULL"
+    return conn.execute(sql).fetchone()[0]
+
+
+def export_json(filenames=None, conn=None):
+    """Writes the legacy JSON files from the store so older scripts keep working."""
+    for filename in filenames or JSON_EXPORTS:
+        stage, columns = JSON_EXPORTS[filename]
+        listings = fetch_listings(stage=stage, conn=conn)
+        if columns:
+            listings = [{c: l[c] for c in columns if c in l} for l in listings]
+        try:
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(listings, f, ensure_ascii=False, indent=4)
+            print(f"✅ Exported {len(listings)} listings to {filename}")
+        except Exception as e:
+            print(f"❌ Failed to export {filename}: {e}")
+
+
+def _read_legacy_file(filename):
+    with open(filename, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):  # The scraper's state file
+        data = list(data.get('listings', {}).values())
+    return [item for item in data if isinstance(item, dict) and 'link' in item]
+
+
+def import_json(conn=None):
+    """Imports the JSON files of the previous pipeline. Listings already in the store are left
+    alone: they were scraped since and are newer than anything in the files."""
+    conn = conn or connect()
+    existing = {obid for (obid,) in conn.execute("SELECT obid FROM listings")}
+    for filename, stage in LEGACY_SOURCES:
+        try:
+            listings = [item for item in _read_legacy_file(filename) if obid_for(item) not in existing]
+        except (FileNotFoundError, json.JSONDecodeError):
+            continue
+        if stage == 'enriched':
+            # Only rows that actually carry detail data count as enriched
+            upsert_listings(listings, 'scraped', conn=conn)
+            upsert_listings(listings, stage, done=lambda l: l.get('warm_miete') or l.get('status'), conn=conn)
+        else:
+            upsert_listings(listings, stage, conn=conn)
+        print(f"✅ Imported {len(listings)} listings from {filename} ({stage}).")
+
+
+def import_legacy_once(conn=None):
+    """Runs import_json the first time any stage opens this store, even if the scraper has
+    already added new listings to it (a store is not empty just because history was imported)."""
+    conn = conn or connect()
+    if conn.execute("SELECT 1 FROM store_meta WHERE key = ?", (LEGACY_IMPORT_MARKER,)).fetchone():
+        return
+    import_json(conn=conn)
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES (?, ?)", (LEGACY_IMPORT_MARKER, str(time.time())))
+
+
+def load_pending(stage, conn=None):
+    """Listings still pending for `stage`; imports the legacy JSON files on first use."""
+    import_legacy_once(conn=conn)
+    return fetch_listings(pending=stage, conn=conn)
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else "export"
+    if command == "export":
+        export_json()
+    elif command == "import":
+        import_json()
+    elif command == "stats":
+        print(f"Total: {count_listings()}")
+        for stage in STAGES:
+            print(f"  {stage:<10} {count_listings(stage)}")
+    else:
+        print("Usage: python3 listing_store.py [export|import|stats]")
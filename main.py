@@ -1,41 +1,12 @@
 # main.py (Refactored to include local JSON saving)
 
-import requests
-import time
 import json # <--- NEW IMPORT
 from scraper import scrape_listings
-from config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
+from telegram_notifier import NotificationQueue, send_telegram_message, format_listing_message
+from notification_ledger import NotificationLedger
 
-TELEGRAM_API = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
 JSON_FILE_PATH = "listings_data.json" # <--- Define local file path
 
-def send_telegram_message(text):
-    """Sends a message to the specified Telegram chat."""
-    payload = {
-        'chat_id': TELEGRAM_CHAT_ID,
-        'text': text,
-        'parse_mode': 'Markdown'
-    }
-    try:
-        response = requests.post(TELEGRAM_API, data=payload)
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
-        print(f"❌ Failed to send Telegram message: {e}")
-        if response is not None:
-             print(f"Response content: {response.text}")
-        return None
-
-def format_listing_message(listing):
-    """Formats a single listing into a concise Markdown string."""
-    # Ensure you are using the correct keys from scraper.py (size_m2 is now available)
-    return (
-        f"• *{listing['title']}*\n"
-        f"  €{listing['price']} | Rooms: {listing['rooms']} | Size: {listing.get('size_m2', 'N/A')}\n"
-        f"  Location: {listing['address']}\n"
-        f"  [View Listing]({listing['link']})\n"
-    )
-
 def save_listings_to_json(listings):
     """Saves the scraped listings data to a local JSON file."""
     try:
@@ -64,20 +35,27 @@ def run_project():
     # --- 2. Save Data Locally ---
     save_listings_to_json(listings) # <--- CALL THE NEW FUNCTION
     
-    # --- 3. Filter/Process Data (Placeholder) ---
-    new_listings_count = len(listings)
+    # --- 3. Keep only listings not announced before (or whose price/size/rooms changed) ---
+    ledger = NotificationLedger()
+    to_announce = [listing for listing in listings if ledger.should_notify(listing)]
+    new_listings_count = len(to_announce)
+    print(f"{new_listings_count} listings are new or changed since the last notification.")
+    if not to_announce:
+        return
     
     # --- 4. Send Telegram Notifications ---
     
+    # Queued messages are packed into as few Telegram messages as the length limit allows
+    notifications = NotificationQueue()
     header_message = f"🎉 **New Berlin Listings Found!** (Total: {new_listings_count} properties)"
-    send_telegram_message(header_message)
+    notifications.enqueue(header_message)
     
-    for i, listing in enumerate(listings):
-        message = format_listing_message(listing)
-        send_telegram_message(message)
-        time.sleep(1) 
+    for listing in to_announce:
+        prefix = "💸 *Updated:* " if ledger.status(listing) == 'changed' else ""
+        notifications.enqueue(prefix + format_listing_message(listing), on_sent=lambda listing=listing: ledger.mark_sent(listing))
 
-    print("✅ All notifications sent successfully.")
+    notifications.close()
+    print("✅ All notifications sent.")
 
 
 if __name__ == '__main__':
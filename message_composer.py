@@ -0,0 +1,169 @@
+# message_composer.py (Builds application messages locally from templates: no API key, no network)
+
+import hashlib
+import re
+
+import config
+import listing_store
+from district_analyzer import DISTRICT_LOWER_MAP
+
+# Settings added after the first config.py versions; older config files may not have them
+ABOUT_ME = getattr(config, 'ABOUT_ME', "")
+MESSAGE_SIGNATURE = getattr(config, 'MESSAGE_SIGNATURE', "")
+
+# --- Phrase banks. Every message picks one variant per slot, chosen by the listing's hash ---
+GREETINGS = [
+    "Sehr geehrte Damen und Herren,",
+    "Guten Tag,",
+    "Sehr geehrte Vermieterin, sehr geehrter Vermieter,",
+]
+
+OPENINGS = [
+    "mit großem Interesse habe ich Ihr Angebot für die {flat}{location} gelesen.",
+    "Ihre Anzeige für die {flat}{location} hat mich sofort angesprochen.",
+    "gerade habe ich Ihr Inserat für die {flat}{location} entdeckt und möchte mich gerne darauf bewerben.",
+    "ich interessiere mich sehr für die {flat}{location}, die Sie auf ImmoScout24 anbieten.",
+]
+
+FEATURE_SENTENCES = [
+    "An der Wohnung schätze ich besonders {features}.",
+    "Besonders freue ich mich über {features}.",
+    "Gerade {features} finde ich sehr ansprechend.",
+]
+
+FIT_SENTENCES = [
+    "{facts} passt die Wohnung sehr gut zu meinen Vorstellungen und meinem Budget.",
+    "{facts} entspricht die Wohnung genau meiner Suche.",
+    "{facts} wäre die Wohnung für mich ideal.",
+]
+
+DISTRICT_SENTENCES = [
+    "{district} ist genau die Gegend, in der ich wohnen möchte.",
+    "Ich suche gezielt in {district} und würde mich freuen, dort einzuziehen.",
+    "Die Lage in {district} ist für mich ideal.",
+]
+
+CLOSINGS = [
+    "Über eine Einladung zu einer Besichtigung würde ich mich sehr freuen.",
+    "Ich würde mich sehr über die Möglichkeit einer Besichtigung freuen.",
+    "Gerne stelle ich mich bei einer Besichtigung persönlich vor; alle Unterlagen kann ich sofort einreichen.",
+]
+
+SIGN_OFFS = ["Mit freundlichen Grüßen", "Viele Grüße", "Beste Grüße"]
+
+# --- Title keyword -> the feature as named in a sentence (accusative; at most MAX_FEATURES per message) ---
+TITLE_FEATURES = [
+    (("balkon", "loggia"), "den Balkon"),
+    (("terrasse", "dachterrasse"), "die Terrasse"),
+    (("garten",), "den Garten"),
+    (("altbau",), "den Altbau-Charme"),
+    (("neubau", "erstbezug"), "die moderne Ausstattung"),
+    (("saniert", "renoviert", "modernisiert"), "den frisch sanierten Zustand"),
+    (("einbauküche", "ebk"), "die Einbauküche"),
+    (("hell", "lichtdurchflutet", "sonnig"), "die hellen Räume"),
+    (("ruhig", "ruhige"), "die ruhige Lage"),
+    (("aufzug", "fahrstuhl", "lift"), "den Aufzug"),
+    (("dielen", "dielenboden", "parkett"), "die Holzböden"),
+]
+
+MAX_FEATURES = 2
+
+# Keywords match whole words only (plus a German adjective ending: 'helle', 'ruhigen'),
+# so 'Tiergarten' is no garden and 'Hellersdorf' no bright flat
+TITLE_FEATURE_PATTERNS = [
+    (re.compile(r"\b(?:" + "|".join(map(re.escape, keywords)) + r")(?:e|em|en|er|es)?\b"), phrase)
+    for keywords, phrase in TITLE_FEATURES
+]
+
+# 'Musterstraße 12a': letters, then a house number. Rules out ZIP segments ('10115 Berlin') and bare districts
+STREET_PATTERN = re.compile(r"[^\W\d_].*?\s\d+\s*[a-zA-Z]?(?:\s*[-/]\s*\d+\s*[a-zA-Z]?)?")
+
+
+def is_configured():
+    """True once ABOUT_ME is filled in. Until then the template's '[...]' placeholder would be sent
+    to landlords, so message_generator.py keeps using GENERIC_FALLBACK_MESSAGE."""
+    about = ABOUT_ME.strip()
+    return bool(about) and not (about.startswith("[") and about.endswith("]"))
+
+
+def _pick(options, digest, slot):
+    """Variant for one slot, fixed per listing: the same listing always gets the same message."""
+    return options[digest[slot] % len(options)]
+
+
+def _number(value):
+    """2.0 -> '2', 2.5 -> '2,5', 1050 -> '1.050' (German formatting)."""
+    if value == int(value):
+        return f"{int(value):,}".replace(",", ".")
+    return f"{value:.1f}".replace(".", ",")
+
+
+def title_features(title):
+    title_lower = (title or '').lower()
+    features = []
+    for pattern, phrase in TITLE_FEATURE_PATTERNS:
+        if pattern.search(title_lower):
+            features.append(phrase)
+            if len(features) == MAX_FEATURES:
+                break
+    return features
+
+
+def street_of(address):
+    """The street with house number from an address like 'Musterstraße 12, 10115 Berlin, Mitte'.
+    None when the first segment is a ZIP code, a district or has no house number."""
+    if not address or address == "N/A":
+        return None
+    segment = address.split(',')[0].strip()
+    if segment.lower() in DISTRICT_LOWER_MAP or not STREET_PATTERN.fullmatch(segment):
+        return None
+    return segment
+
+
+def compose_message(listing):
+    """A complete German application message for one cleaned listing, built from its district,
+    rooms, size, warm rent and title keywords. Takes microseconds; missing fields are left out."""
+    digest = hashlib.sha1(listing_store.obid_for(listing).encode('utf-8')).digest()
+    rooms = listing.get('rooms_numeric')
+    size = listing.get('size_numeric')
+    warm = listing.get('warm_miete_numeric')
+    district = listing.get('district')
+    street = street_of(listing.get('address'))
+
+    flat = f"{_number(rooms)}-Zimmer-Wohnung" if rooms else "Wohnung"
+    if street:
+        location = f" in der {street}"
+    elif district:
+        location = f" in {district}"
+    else:
+        location = ""
+    sentences = [_pick(OPENINGS, digest, 1).format(flat=flat, location=location)]
+
+    features = title_features(listing.get('title'))
+    if features:
+        sentences.append(_pick(FEATURE_SENTENCES, digest, 2).format(features=" und ".join(features)))
+
+    facts = []
+    if size:
+        facts.append(f"{_number(size)} m²")
+    if warm:
+        facts.append(f"einer Warmmiete von {_number(warm)} €")
+    if facts:
+        sentences.append(_pick(FIT_SENTENCES, digest, 3).format(facts="Mit " + " und ".join(facts)))
+    if district and street:  # Without a street the opening already names the district
+        sentences.append(_pick(DISTRICT_SENTENCES, digest, 4).format(district=district))
+
+    paragraphs = [_pick(GREETINGS, digest, 0), " ".join(sentences)]
+    if ABOUT_ME.strip():
+        paragraphs.append(ABOUT_ME.strip())
+    paragraphs.append(_pick(CLOSINGS, digest, 5))
+    paragraphs.append(f"{_pick(SIGN_OFFS, digest, 6)},\n{MESSAGE_SIGNATURE}")
+    return "\n\n".join(paragraphs)
+
+
+if __name__ == '__main__':
+    import json
+
+    with open("filtered_results.json", 'r', encoding='utf-8') as f:
+        for listing in json.load(f)[:3]:
+            print(f"🔗 {listing['link']}\n{compose_message(listing)}\n" + "-" * 60)
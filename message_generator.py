@@ -1,16 +1,76 @@
 # message_generator.py
 
+import argparse
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from openai import OpenAI
 from config import OPENAI_API_KEY, USER_BACKGROUND, GENERIC_FALLBACK_MESSAGE
+import config
+import listing_store
+import message_composer
+
+# Settings added after the first config.py versions; older config files may not have them
+OPENAI_BASE_URL = getattr(config, 'OPENAI_BASE_URL', "")
+OPENAI_MODEL = getattr(config, 'OPENAI_MODEL', None) or "gpt-3.5-turbo"
+MESSAGE_WORKERS = getattr(config, 'MESSAGE_WORKERS', 4)
+
+MESSAGE_LOOKAHEAD = 3  # Messages generated ahead of the listing under review; listings you never reach cost no API call
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """One OpenAI client for all calls and threads (keeps its HTTP connections alive).
+
+    OPENAI_BASE_URL can point at any OpenAI-compatible endpoint, e.g. a local fake for testing.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL or None)
+        return _client
+
+
+# --- Message cache (table 'messages' in the listing store) ---
+
+def message_key(listing_title, listing_address, listing_price):
+    """Cache key: a message only has to be regenerated if the listing or USER_BACKGROUND changed."""
+    raw = json.dumps([listing_title, listing_address, str(listing_price), USER_BACKGROUND], ensure_ascii=False)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _ensure_table(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS messages (key TEXT PRIMARY KEY, message TEXT, created_at REAL)")
+
+
+def cached_message(key):
+    conn = listing_store.connect()
+    _ensure_table(conn)
+    row = conn.execute("SELECT message FROM messages WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def store_message(key, message):
+    conn = listing_store.connect()
+    with conn:
+        _ensure_table(conn)
+        conn.execute("INSERT OR REPLACE INTO messages (key, message, created_at) VALUES (?, ?, ?)", (key, message, time.time()))
+
 
 def generate_ai_message(listing_title, listing_address, listing_price):
     """
     Generates a personalized application message using ChatGPT.
-    Falls back to a detailed template if API fails.
+    Returns a cached message if one was generated for this listing before.
+    Falls back to a detailed template if API fails (fallbacks are not cached).
     """
     # 1. Prepare the Fallback (Safe version)
     # We use .format() to insert the address into the template from config.py
-    # If address is N/A, we just say "Ihrer angebotenen Wohnung" via a quick check, 
+    # If address is N/A, we just say "Ihrer angebotenen Wohnung" via a quick check,
     # but usually address is present.
     safe_address = listing_address if listing_address != "N/A" else "Ihrer angebotenen Wohnung"
     fallback_text = GENERIC_FALLBACK_MESSAGE.format(address=safe_address)
@@ -19,20 +79,23 @@ def generate_ai_message(listing_title, listing_address, listing_price):
         print("⚠️ No OpenAI Key found. Using detailed fallback message.")
         return fallback_text
 
-    client = OpenAI(api_key=OPENAI_API_KEY)
+    key = message_key(listing_title, listing_address, listing_price)
+    cached = cached_message(key)
+    if cached:
+        return cached
 
     # 2. Construct the AI Prompt
     user_prompt = f"""
     Write a polite, professional, and convincing application message in German for an apartment.
-    
+
     Target Apartment:
     - Title: {listing_title}
     - Address: {listing_address}
     - Price (Warm): {listing_price}
-    
+
     My Background:
     {USER_BACKGROUND}
-    
+
     Instructions:
     - Start with a formal salutation.
     - Mention the specific street/location ({listing_address}) to show I read the ad.
@@ -42,18 +105,90 @@ def generate_ai_message(listing_title, listing_address, listing_price):
     """
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
+        response = get_client().chat.completions.create(
+            model=OPENAI_MODEL,
             messages=[
                 {"role": "system", "content": "You are a polite, professional prospective tenant writing perfect German application emails."},
                 {"role": "user", "content": user_prompt}
             ],
             temperature=0.7,
         )
-        
+
         generated_text = response.choices[0].message.content.strip()
+        store_message(key, generated_text)
         return generated_text
 
     except Exception as e:
         print(f"❌ OpenAI Error: {e}. Using fallback.")
-        return fallback_text
\ No newline at end of file
+        return fallback_text
+
+
+def message_for_listing(listing):
+    """generate_ai_message with the listing fields apply_bot.py uses.
+
+    Without an API key the message is composed locally, but only once ABOUT_ME is filled in;
+    otherwise generate_ai_message returns GENERIC_FALLBACK_MESSAGE as before.
+    """
+    if not OPENAI_API_KEY and message_composer.is_configured():
+        return message_composer.compose_message(listing)
+    price = listing.get('warm_miete_numeric', listing.get('cold_miete', 'N/A'))
+    return generate_ai_message(listing_title=listing['title'], listing_address=listing.get('address', 'N/A'), listing_price=str(price))
+
+
+class MessagePool:
+    """Generates messages in a background thread pool, a few listings ahead of the review.
+
+    prefetch() is called with the review position; at most `ahead` wanted listings from there
+    on are queued. close() (or leaving the `with` block) cancels everything not started yet,
+    so quitting the review does not wait for, or pay for, messages nobody will send.
+    """
+
+    def __init__(self, workers=MESSAGE_WORKERS, ahead=MESSAGE_LOOKAHEAD, wanted=None):
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="message")
+        self.ahead = ahead
+        self.wanted = wanted or (lambda listing: True)
+        self.futures = {}  # link -> Future; future.result() is the message text
+
+    def prefetch(self, listings, start=0):
+        """Queues the next `ahead` wanted listings from listings[start:] that are not queued yet."""
+        queued = 0
+        for listing in listings[start:]:
+            if queued >= self.ahead:
+                break
+            if not self.wanted(listing):
+                continue
+            queued += 1
+            if listing['link'] not in self.futures:
+                self.futures[listing['link']] = self.executor.submit(message_for_listing, listing)
+
+    def get(self, listing):
+        """The message for a listing: from the pool if it was prefetched, generated right now otherwise."""
+        future = self.futures.get(listing['link'])
+        return future.result() if future else message_for_listing(listing)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == '__main__':
+    import ranking
+
+    parser = argparse.ArgumentParser(description="Pre-generate application messages for the best filtered listings.")
+    parser.add_argument("--top", type=int, default=ranking.TOP_K, help=f"Number of best-scored listings (default: {ranking.TOP_K})")
+    parser.add_argument("--workers", type=int, default=MESSAGE_WORKERS, help=f"Parallel requests (default: {MESSAGE_WORKERS})")
+    args = parser.parse_args()
+
+    with open("filtered_results.json", 'r', encoding='utf-8') as f:
+        candidates = ranking.top_listings(json.load(f), args.top)
+    started = time.monotonic()
+    with MessagePool(args.workers, ahead=len(candidates)) as pool:
+        pool.prefetch(candidates)
+        for listing in candidates:
+            pool.get(listing)
+    print(f"✅ {len(candidates)} messages ready in {time.monotonic() - started:.1f}s (cached in {listing_store.STORE_FILE}).")
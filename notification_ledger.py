@@ -0,0 +1,85 @@
+# notification_ledger.py (Remembers what was already announced so reruns only send news)
+
+import hashlib
+import time
+
+import listing_store
+from data_cleaner import clean_money_string, clean_size_string, clean_rooms_string
+
+HASH_PREFIX = "n1:"  # Marks hashes of normalized values; older ledger rows hold raw-string hashes
+
+
+def _normalized(value):
+    return "" if value is None else repr(float(value))
+
+
+def content_hash(listing):
+    """Short hash of the fields whose change is worth a new notification (cold rent, size, rooms).
+
+    Uses the parsed numbers, and the cold rent because both the search card ('price') and the
+    expose ('cold_miete') have it, so main.py, pipeline.py and watcher.py hash a listing alike.
+    """
+    rent = listing.get('cold_miete_numeric') or clean_money_string(listing.get('cold_miete') or listing.get('price') or '')
+    size = listing.get('size_numeric') or clean_size_string(listing.get('size_m2') or '')
+    rooms = listing.get('rooms_numeric') or clean_rooms_string(listing.get('rooms') or '')
+    fields = (_normalized(rent), _normalized(size), _normalized(rooms))
+    return HASH_PREFIX + hashlib.sha1("|".join(fields).encode('utf-8')).hexdigest()[:16]
+
+
+class NotificationLedger:
+    """Persistent sent-notifications ledger keyed by OBID, held in memory as a dict for O(1) lookups.
+
+    Lives in the listing store database (table 'notifications'). A scope (e.g. a subscriber name)
+    keeps a separate record, so every subscriber is told about a listing once.
+    """
+
+    def __init__(self, scope=None):
+        self.scope = scope
+        conn = listing_store.connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS notifications (obid TEXT PRIMARY KEY, content_hash TEXT, sent_at REAL)"
+        )
+        conn.commit()
+        if scope:
+            # Only this scope's rows: keys '<scope>:<obid>' sort between '<scope>:' and '<scope>;' (primary key range)
+            rows = conn.execute(
+                "SELECT obid, content_hash FROM notifications WHERE obid >= ? AND obid < ?", (f"{scope}:", f"{scope};")
+            )
+        else:
+            rows = conn.execute("SELECT obid, content_hash FROM notifications WHERE instr(obid, ':') = 0")
+        self.sent = {row[0]: row[1] for row in rows}
+
+    def _key(self, listing):
+        obid = listing_store.obid_for(listing)
+        return f"{self.scope}:{obid}" if self.scope else obid
+
+    def status(self, listing):
+        """'new', 'changed' or None (already announced with the same price, size and rooms)."""
+        key = self._key(listing)
+        previous = self.sent.get(key)
+        if previous is None:
+            return 'new'
+        if not previous.startswith(HASH_PREFIX):
+            # Announced before the hash was normalized: take the current values as the baseline
+            self._store(key, content_hash(listing))
+            return None
+        if previous != content_hash(listing):
+            return 'changed'
+        return None
+
+    def should_notify(self, listing):
+        return self.status(listing) is not None
+
+    def mark_sent(self, listing):
+        """Records a successful notification (safe to call from the notification thread)."""
+        self._store(self._key(listing), content_hash(listing))
+
+    def _store(self, key, digest):
+        self.sent[key] = digest
+        conn = listing_store.connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO notifications (obid, content_hash, sent_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(obid) DO UPDATE SET content_hash = excluded.content_hash, sent_at = excluded.sent_at",
+                (key, digest, time.time()),
+            )
@@ -0,0 +1,212 @@
+# pipeline.py (Streaming runner: scrape -> enrich -> district-tag -> clean -> filter -> notify)
+
+import argparse
+import queue
+import threading
+import time
+
+import scraper
+import detail_scraper
+import district_analyzer
+import data_cleaner
+import filter_listings
+import listing_store
+import ranking
+from browser_session import initialize_driver
+from rate_limiter import AdaptivePacer
+from telegram_notifier import NotificationQueue, format_match_message
+from notification_ledger import NotificationLedger
+from subscriber_matcher import SubscriberMatcher, load_subscriptions
+
+_END_OF_SCRAPE = object()
+
+
+class Enricher:
+    """Detail enrichment for one listing at a time: HTTP fast path, browser started only if needed."""
+
+    def __init__(self, use_http=True):
+        self.pacer = AdaptivePacer('detail')
+        self.http = detail_scraper.create_http_session() if use_http else None
+        self.driver = None
+
+    def get_driver(self):
+        if self.driver is None:
+            # Never attached: the scraper thread runs its own browser at the same time
+            self.driver = initialize_driver(profile="detail", attach="")
+        return self.driver
+
+    def enrich(self, listing):
+        status, _ = detail_scraper.process_listing(listing, listing_store.obid_for(listing), self.pacer, self.http, self.get_driver)
+        return status
+
+    def close(self):
+        if self.driver:
+            self.driver.quit()
+        if self.http:
+            self.http.close()
+        self.pacer.print_stats()
+
+
+def prepare_listing(listing, enricher, stats):
+    """Enriches, district-tags and cleans one freshly scraped listing. Returns None if it is offline."""
+    status = enricher.enrich(listing)
+    listing_store.upsert_listings([listing], 'enriched', done=lambda l: not detail_scraper.needs_enrichment(l))
+    if status == detail_scraper.NO_OFFER:
+        stats['offline'] += 1
+        return None
+    if status in (detail_scraper.BLOCKED, detail_scraper.FAILED):
+        # Left pending in the store; detail_scraper.py picks it up later
+        stats['blocked'] += 1
+
+    district_analyzer.tag_listing(listing)
+    listing_store.upsert_listings([listing], 'tagged')
+
+    data_cleaner.clean_listing(listing)
+    listing_store.upsert_listings([listing], 'cleaned')
+    return listing
+
+
+def process_listing(listing, enricher, stats):
+    """Pushes one freshly scraped listing through every stage. Returns it if it matches the filter."""
+    listing = prepare_listing(listing, enricher, stats)
+    if listing is None or filter_listings.rejection_reason(listing):
+        return None
+    return listing
+
+
+class SubscriberRouter:
+    """Sends every prepared listing to the saved searches it matches (see subscriber_matcher.py).
+
+    All subscribers share the pipeline's NotificationQueue (one bot, one session); each message
+    carries the subscriber's chat_id. Only the ledgers are kept per subscriber.
+    """
+
+    def __init__(self, path, notifications=None):
+        self.matcher = SubscriberMatcher(load_subscriptions(path))
+        self.notifications = notifications
+        self.ledgers = {}
+        print(f"👥 Routing listings to {len(self.matcher.subscriptions)} saved searches.")
+
+    def route(self, listing):
+        """Queues a notification for every matching saved search that has a chat_id."""
+        for subscription in self.matcher.match(listing):
+            name = subscription['name']
+            if not (self.notifications and subscription['chat_id']):
+                continue
+            if name not in self.ledgers:
+                self.ledgers[name] = NotificationLedger(scope=name)
+            ledger = self.ledgers[name]
+            if ledger.should_notify(listing):
+                self.notifications.enqueue(format_match_message(listing), on_sent=lambda l=listing, ledger=ledger: ledger.mark_sent(l),
+                                           chat_id=subscription['chat_id'])
+
+    def save(self):
+        """Writes filtered_results_<name>.json for every saved search (all stored matches, not only new ones)."""
+        routed = self.matcher.route(filter_listings.load_data())
+        for name, matches in routed.items():
+            matches.sort(key=lambda x: (x.get('warm_miete_numeric') or float('inf'), -(x.get('rooms_numeric') or 0)))
+            filter_listings.save_filtered_data(matches, filter_listings.output_file_for(name))
+
+
+def _produce(work, incremental, stop_after):
+    """Scraper thread: hands every new listing to the pipeline as soon as its page is done."""
+    try:
+        for listing in scraper.iter_new_listings(incremental, stop_after):
+            work.put(listing)
+    except Exception as e:
+        print(f"❌ Scraper stopped: {e}")
+    finally:
+        work.put(_END_OF_SCRAPE)
+
+
+def run_pipeline(incremental=True, stop_after=1, use_http=True, notify=True, subscribers=None):
+    """Runs all stages as a stream and returns the matching listings.
+
+    subscribers: path to a subscribers TOML file; every listing is also routed to those saved searches.
+    """
+    started = time.monotonic()
+    stats = {'scraped': 0, 'matched': 0, 'offline': 0, 'blocked': 0}
+    first_match_after = None
+    matches = []
+
+    scraper.load_state()
+    data_cleaner.parse_cache.load()
+    work = queue.Queue()
+    producer = threading.Thread(target=_produce, args=(work, incremental, stop_after), daemon=True)
+    producer.start()
+
+    enricher = Enricher(use_http)
+    notifications = NotificationQueue() if notify else None
+    ledger = NotificationLedger()
+    router = SubscriberRouter(subscribers, notifications) if subscribers else None
+    # Leaders among earlier matches; new matches are slotted in as they arrive
+    leaders = ranking.TopK()
+    for earlier in filter_listings.filter_and_sort(filter_listings.load_data())[0]:
+        leaders.add(earlier)
+    try:
+        while True:
+            listing = work.get()
+            if listing is _END_OF_SCRAPE:
+                break
+            stats['scraped'] += 1
+
+            listing = prepare_listing(listing, enricher, stats)
+            if listing is None:
+                continue
+            if router:
+                router.route(listing)
+            if filter_listings.rejection_reason(listing):
+                continue
+
+            stats['matched'] += 1
+            matches.append(listing)
+            if first_match_after is None:
+                first_match_after = time.monotonic() - started
+            print(f"🎯 MATCH: {listing['title']} ({listing.get('district')}, {listing.get('warm_miete_numeric')} €)")
+            if leaders.add(listing):
+                print(f"   🏆 Enters the top {leaders.k} at #{leaders.rank_of(listing)}")
+            if notifications and ledger.should_notify(listing):
+                notifications.enqueue(format_match_message(listing), on_sent=lambda listing=listing: ledger.mark_sent(listing))
+    finally:
+        enricher.close()
+        producer.join()
+        if notifications:
+            notifications.close()
+        data_cleaner.parse_cache.save()
+
+    # Refresh the files the standalone scripts and apply_bot.py read
+    listing_store.export_json()
+    all_matches, _ = filter_listings.filter_and_sort(filter_listings.load_data())
+    filter_listings.save_filtered_data(all_matches)
+    if router:
+        router.save()
+
+    print("\n" + "=" * 60)
+    print(f"🏁 Pipeline finished in {time.monotonic() - started:.1f}s")
+    print(f"   New listings: {stats['scraped']} | Matches: {stats['matched']} | "
+          f"Offline: {stats['offline']} | Blocked or unreadable (left pending): {stats['blocked']}")
+    if first_match_after is not None:
+        print(f"   ⏱️ Time to first match: {first_match_after:.1f}s")
+    data_cleaner.parse_cache.print_stats()
+    print(f"\n🏆 Top {leaders.k} (apply_bot.py reviews these first):")
+    for position, leader in enumerate(leaders.best(), 1):
+        print(f"   {position:>2}. {ranking.score(leader):6.2f}  {leader['title']} ({leader.get('district')}, {leader.get('warm_miete_numeric')} €)")
+    return matches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run scrape, enrichment, tagging, cleaning, filtering and notification as one stream.")
+    parser.add_argument("--full", action="store_true", help="Resume the full crawl instead of only fetching new listings from page 1")
+    parser.add_argument("--stop-after", type=int, default=1, help="Consecutive all-known pages before an incremental scrape stops (default: 1)")
+    parser.add_argument("--browser-only", action="store_true", help="Skip the plain-HTTP fast path for expose pages")
+    parser.add_argument("--no-notify", action="store_true", help="Do not send Telegram messages for matches")
+    parser.add_argument("--subscribers", help="TOML file with saved searches to route every listing to (see subscribers.example.toml)")
+    args = parser.parse_args()
+
+    run_pipeline(
+        incremental=not args.full,
+        stop_after=args.stop_after,
+        use_http=not args.browser_only,
+        notify=not args.no_notify,
+        subscribers=args.subscribers,
+    )
@@ -0,0 +1,186 @@
+# price_history.py (Append-only log of what each search card showed over time: price drops, edits, relistings)
+
+import argparse
+import hashlib
+import json
+import time
+
+import listing_store
+from data_cleaner import clean_money_string
+
+# --- Card fields whose changes are tracked ---
+CARD_FIELDS = ['title', 'address', 'price', 'size_m2', 'rooms']
+
+RELIST_AFTER_SECONDS = 7 * 86400  # A card that was gone this long and shows up again counts as relisted
+# ... but only if the result page it was last seen on was crawled in between (without it). Incremental
+# runs stop after the first pages, so deep cards going unseen for a while is not evidence that they were gone.
+
+# --- What observe() reports per card ---
+NEW, CHANGED, RELISTED, UNCHANGED = 'new', 'changed', 'relisted', None
+
+
+def card_hash(listing):
+    """Short hash of the card fields; equal hashes mean nothing visible on the card changed."""
+    fields = "\x1f".join(str(listing.get(field) or '') for field in CARD_FIELDS)
+    return hashlib.sha1(fields.encode('utf-8')).hexdigest()[:16]
+
+
+def _ensure_tables(conn):
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS observations ("
+        "obid TEXT, observed_at REAL, kind TEXT, card_hash TEXT, changes TEXT)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_observations_obid ON observations (obid, observed_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_observations_observed_at ON observations (observed_at)")
+    # Latest state per card, overwritten in place so it stays one row per OBID
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS card_state (obid TEXT PRIMARY KEY, card_hash TEXT, card TEXT, last_seen_at REAL)"
+    )
+    if 'page' not in {row[1] for row in conn.execute("PRAGMA table_info(card_state)")}:
+        conn.execute("ALTER TABLE card_state ADD COLUMN page INTEGER")
+    # When each result page was last crawled
+    conn.execute("CREATE TABLE IF NOT EXISTS crawled_pages (page INTEGER PRIMARY KEY, crawled_at REAL)")
+    conn.commit()
+
+
+class PriceHistory:
+    """Compares freshly scraped cards with what was seen before and logs only the differences.
+
+    The observation log is append-only: a card's first sighting stores all card fields, later
+    rows store only the fields that changed as {field: [old, new]}. Unchanged cards cost a hash
+    comparison in memory and a last-seen update.
+    """
+
+    def __init__(self):
+        conn = listing_store.connect()
+        _ensure_tables(conn)
+        self.state = {
+            obid: (digest, last_seen_at, page)
+            for obid, digest, last_seen_at, page in conn.execute("SELECT obid, card_hash, last_seen_at, page FROM card_state")
+        }
+        self.crawled = dict(conn.execute("SELECT page, crawled_at FROM crawled_pages"))
+        self.crawled_before = dict(self.crawled)
+
+    def start_crawl(self):
+        """Call at the start of every crawl: only pages crawled before it count as evidence for RELISTED
+        (a card that moved down one page during this crawl was not gone)."""
+        self.crawled_before = dict(self.crawled)
+
+    def _was_gone(self, previous, now):
+        """True if the card was unseen for RELIST_AFTER_SECONDS although its last page was crawled meanwhile."""
+        _, last_seen_at, page = previous
+        if last_seen_at is None or now - last_seen_at <= RELIST_AFTER_SECONDS:
+            return False
+        return page is not None and self.crawled_before.get(page, 0) > last_seen_at
+
+    def is_known(self, obid):
+        return obid in self.state
+
+    def observe(self, listings, now=None, page=None):
+        """Records one crawl's view of these cards (from result page `page`). Returns [(listing, kind)]
+        for every card that is NEW, CHANGED or RELISTED; unchanged cards are left out."""
+        now = now or time.time()
+        conn = listing_store.connect()
+        reported = []
+        log_rows = []
+        state_rows = []
+        seen_rows = []
+
+        for listing in listings:
+            obid = listing_store.obid_for(listing)
+            digest = card_hash(listing)
+            card = {field: listing.get(field) for field in CARD_FIELDS}
+            previous = self.state.get(obid)
+
+            if previous is None:
+                kind, changes = NEW, card
+            elif previous[0] != digest:
+                old_card = json.loads(conn.execute("SELECT card FROM card_state WHERE obid = ?", (obid,)).fetchone()[0])
+                kind = CHANGED
+                changes = {field: [old_card.get(field), value] for field, value in card.items() if old_card.get(field) != value}
+            elif self._was_gone(previous, now):
+                kind, changes = RELISTED, {}
+            else:
+                seen_rows.append((now, page, obid))
+                self.state[obid] = (digest, now, page if page is not None else previous[2])
+                continue
+
+            log_rows.append((obid, now, kind, digest, json.dumps(changes, ensure_ascii=False)))
+            state_rows.append((obid, digest, json.dumps(card, ensure_ascii=False), now, page))
+            self.state[obid] = (digest, now, page)
+            reported.append((listing, kind))
+
+        with conn:
+            conn.executemany("INSERT INTO observations (obid, observed_at, kind, card_hash, changes) VALUES (?, ?, ?, ?, ?)", log_rows)
+            conn.executemany(
+                "INSERT INTO card_state (obid, card_hash, card, last_seen_at, page) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(obid) DO UPDATE SET card_hash = excluded.card_hash, card = excluded.card, "
+                "last_seen_at = excluded.last_seen_at, page = excluded.page",
+                state_rows,
+            )
+            conn.executemany("UPDATE card_state SET last_seen_at = ?, page = COALESCE(?, page) WHERE obid = ?", seen_rows)
+            if page is not None:
+                conn.execute("INSERT OR REPLACE INTO crawled_pages (page, crawled_at) VALUES (?, ?)", (page, now))
+        if page is not None:
+            self.crawled[page] = now
+        return reported
+
+
+def price_drops(hours=24, conn=None):
+    """Cards whose price went down within the last `hours`, biggest drop first."""
+    conn = conn or listing_store.connect()
+    _ensure_tables(conn)
+    since = time.time() - hours * 3600
+    drops = []
+    for obid, observed_at, changes in conn.execute(
+        "SELECT obid, observed_at, changes FROM observations WHERE kind = ? AND observed_at >= ? ORDER BY observed_at",
+        (CHANGED, since),
+    ):
+        price = json.loads(changes).get('price')
+        if not price:
+            continue
+        old, new = clean_money_string(price[0]), clean_money_string(price[1])
+        if old is not None and new is not None and new < old:
+            drops.append({'obid': obid, 'observed_at': observed_at, 'old_price': old, 'new_price': new, 'drop': old - new})
+    drops.sort(key=lambda drop: drop['drop'], reverse=True)
+    return drops
+
+
+def card_history(obid, conn=None):
+    """Rebuilds every version of a card from its delta log: [(observed_at, kind, card)]."""
+    conn = conn or listing_store.connect()
+    _ensure_tables(conn)
+    versions = []
+    card = {}
+    for observed_at, kind, changes in conn.execute(
+        "SELECT observed_at, kind, changes FROM observations WHERE obid = ? ORDER BY observed_at", (obid,)
+    ):
+        delta = json.loads(changes)
+        if kind == NEW:
+            card = dict(delta)
+        elif kind == CHANGED:
+            card = {**card, **{field: values[1] for field, values in delta.items()}}
+        versions.append((observed_at, kind, dict(card)))
+    return versions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Query the card observation log.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    drops_parser = sub.add_parser("drops", help="Price drops within the last hours")
+    drops_parser.add_argument("--hours", type=float, default=24)
+    history_parser = sub.add_parser("history", help="Every version of one listing's card")
+    history_parser.add_argument("obid")
+    args = parser.parse_args()
+
+    if args.command == "drops":
+        drops = price_drops(args.hours)
+        print(f"📉 {len(drops)} price drops in the last {args.hours:g}h")
+        for drop in drops:
+            when = time.strftime('%Y-%m-%d %H:%M', time.localtime(drop['observed_at']))
+            print(f"   {when}  {drop['old_price']} € -> {drop['new_price']} € (-{drop['drop']} €)  "
+                  f"https://www.immobilienscout24.de/expose/{drop['obid']}")
+    else:
+        for observed_at, kind, card in card_history(args.obid):
+            when = time.strftime('%Y-%m-%d %H:%M', time.localtime(observed_at))
+            print(f"{when}  {kind:<8}  {card.get('price')} | {card.get('size_m2')} | {card.get('rooms')} | {card.get('title')}")
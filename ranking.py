@@ -0,0 +1,138 @@
+# ranking.py (Scores filtered listings and keeps only the best N, updated as new ones arrive)
+
+import heapq
+import itertools
+import time
+
+import filter_listings
+import listing_store
+
+# ==========================================
+# 🎛️ SCORING SETTINGS (EDIT THESE)
+# ==========================================
+
+# How much each part counts. Each part is roughly between 0 and 1 before weighting.
+SCORE_WEIGHTS = {
+    'price_per_m2': 2.0,   # Cheaper per m² is better
+    'rooms': 0.5,          # More rooms is better (4+ rooms count as 4)
+    'district': 1.0,       # Preferred districts first (see DISTRICT_PREFERENCE)
+    'freshness': 1.0,      # Points lost per FRESHNESS_DAY_SECONDS of age: new listings get fewer competitors
+}
+
+REFERENCE_PRICE_PER_M2 = 20.0   # €/m² warm that scores 0.5; 0 €/m² scores 1, twice this scores 0
+FRESHNESS_DAY_SECONDS = 86400
+
+# District -> preference between 0 and 1. Empty: derived from the order of filter_listings.TARGET_DISTRICTS
+# (the first entry gets 1.0, the last 0.5).
+DISTRICT_PREFERENCE = {}
+
+# How many listings apply_bot.py gets
+TOP_K = 20
+
+# ==========================================
+
+
+def _district_preference():
+    if DISTRICT_PREFERENCE:
+        return DISTRICT_PREFERENCE
+    targets = filter_listings.TARGET_DISTRICTS
+    return {district: 1 - 0.5 * i / max(1, len(targets) - 1) for i, district in enumerate(targets)}
+
+
+def score_parts(listing, preference=None):
+    """The weighted parts of a listing's score that do not depend on the current time."""
+    preference = preference if preference is not None else _district_preference()
+    warm = listing.get('warm_miete_numeric')
+    size = listing.get('size_numeric')
+    rooms = listing.get('rooms_numeric') or 0
+    price_part = 0.0
+    if warm and size:
+        price_part = max(0.0, 1 - (warm / size) / (2 * REFERENCE_PRICE_PER_M2))
+    return {
+        'price_per_m2': SCORE_WEIGHTS['price_per_m2'] * price_part,
+        'rooms': SCORE_WEIGHTS['rooms'] * min(rooms, 4) / 4,
+        'district': SCORE_WEIGHTS['district'] * preference.get(listing.get('district'), 0),
+    }
+
+
+def ranking_key(listing, preference=None):
+    """Score with freshness anchored to the scrape time instead of 'now'.
+
+    Every listing ages at the same rate, so the order never changes with time and a heap
+    built from these keys stays valid without re-scoring.
+    """
+    seen_at = listing.get('scraped_at') or 0
+    freshness = SCORE_WEIGHTS['freshness'] * seen_at / FRESHNESS_DAY_SECONDS
+    return sum(score_parts(listing, preference).values()) + freshness
+
+
+def score(listing, now=None):
+    """Score as shown to the user: the ranking key with today's age applied (higher is better)."""
+    now = now or time.time()
+    return ranking_key(listing) - SCORE_WEIGHTS['freshness'] * now / FRESHNESS_DAY_SECONDS
+
+
+def top_listings(listings, k=TOP_K):
+    """The k best listings, best first, without sorting the whole list (heap selection, O(n log k))."""
+    preference = _district_preference()
+    return heapq.nlargest(k, listings, key=lambda listing: ranking_key(listing, preference))
+
+
+class TopK:
+    """The best k listings seen so far, kept in a min-heap and updated one listing at a time.
+
+    Re-adding a listing (e.g. after a price change) replaces its old entry. Only the k
+    leaders are held; a listing that drops out is not recalled later, so call top_listings()
+    on the full set when an exact re-rank is needed.
+    """
+
+    def __init__(self, k=TOP_K):
+        self.k = k
+        self.heap = []            # (key, sequence, obid); entries of replaced listings stay until popped
+        self.entries = {}         # obid -> (key, sequence) of the live entry
+        self.listings = {}        # obid -> listing, only for the live entries
+        self.sequence = itertools.count()
+        self.preference = _district_preference()
+
+    def _drop_stale(self):
+        while self.heap and self.entries.get(self.heap[0][2]) != self.heap[0][:2]:
+            heapq.heappop(self.heap)
+
+    def add(self, listing):
+        """Offers a listing. Returns True if it is in the top k afterwards."""
+        obid = listing_store.obid_for(listing)
+        key = ranking_key(listing, self.preference)
+        if obid in self.entries:
+            self.remove(listing)
+
+        if len(self.entries) >= self.k:
+            self._drop_stale()
+            if key <= self.heap[0][0]:
+                return False
+            _, _, evicted = heapq.heappop(self.heap)
+            del self.entries[evicted]
+            del self.listings[evicted]
+
+        entry = (key, next(self.sequence))
+        heapq.heappush(self.heap, (*entry, obid))
+        self.entries[obid] = entry
+        self.listings[obid] = listing
+        return True
+
+    def remove(self, listing):
+        """Forgets a listing (e.g. it went offline or no longer passes the filter)."""
+        obid = listing_store.obid_for(listing)
+        if self.entries.pop(obid, None) is not None:
+            del self.listings[obid]
+
+    def rank_of(self, listing):
+        """1-based position among the current leaders, or None."""
+        obid = listing_store.obid_for(listing)
+        if obid not in self.entries:
+            return None
+        key = self.entries[obid][0]
+        return 1 + sum(1 for other, _ in self.entries.values() if other > key)
+
+    def best(self):
+        """The current leaders, best first."""
+        return sorted(self.listings.values(), key=lambda listing: self.entries[listing_store.obid_for(listing)], reverse=True)
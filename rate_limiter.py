@@ -0,0 +1,107 @@
+# rate_limiter.py (Adaptive per-host pacing shared by the scrapers and the apply bot)
+
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+# --- Pacing profiles: seconds between requests to one host ---
+# start: interval used for a fresh host, min/max: bounds the adaptive interval can move between.
+PACING_PROFILES = {
+    'search': {'start': 7.5, 'min': 3.0, 'max': 120.0},   # scraper.py result pages
+    'detail': {'start': 4.5, 'min': 1.5, 'max': 120.0},   # detail_scraper.py expose pages
+    'apply':  {'start': 3.0, 'min': 1.0, 'max': 60.0},    # apply_bot.py listing visits
+}
+
+SPEEDUP_AFTER = 5       # Healthy responses in a row before the interval shrinks
+SPEEDUP_FACTOR = 0.9    # Interval multiplier after a healthy streak
+BACKOFF_FACTOR = 2.0    # Interval multiplier after a blocked response
+BACKOFF_BASE = 30.0     # First cool-down pause after a block (doubles on every further block)
+JITTER = 0.2            # +/- fraction applied to every wait so requests don't look scripted
+
+
+def looks_blocked(url, title=""):
+    """True for CAPTCHA and 'Zugriff verweigert' pages."""
+    return "captcha" in (url or "").lower() or (title or "").strip() == "Zugriff verweigert"
+
+
+class HostState:
+    """Token bucket (capacity 1) and statistics for one host."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.next_allowed = 0.0
+        self.cooldown_until = 0.0
+        self.ok_streak = 0
+        self.strikes = 0
+        self.requests = 0
+        self.blocked = 0
+        self.waited = 0.0
+
+
+class AdaptivePacer:
+    """Speeds up while a host answers normally and backs off exponentially when it blocks us.
+
+    Call wait(url) right before a request and report(url, blocked) once the response is known.
+    Thread-safe, so one pacer can be shared by several workers.
+    """
+
+    def __init__(self, profile='detail'):
+        self.settings = PACING_PROFILES[profile]
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def _host(self, url):
+        host = urlparse(url).netloc or url
+        if host not in self.hosts:
+            self.hosts[host] = HostState(self.settings['start'])
+        return self.hosts[host]
+
+    def wait(self, url):
+        """Blocks until the host's budget allows the next request and reserves that slot."""
+        with self.lock:
+            state = self._host(url)
+            now = time.monotonic()
+            start = max(now, state.next_allowed, state.cooldown_until)
+            state.next_allowed = start + state.interval * random.uniform(1 - JITTER, 1 + JITTER)
+            state.requests += 1
+            delay = start - now
+            state.waited += delay
+        if delay > 0:
+            time.sleep(delay)
+
+    def report(self, url, blocked=False):
+        """Feeds the outcome of a request back into the host's pacing."""
+        with self.lock:
+            state = self._host(url)
+            if blocked:
+                state.blocked += 1
+                state.ok_streak = 0
+                state.interval = min(self.settings['max'], state.interval * BACKOFF_FACTOR)
+                state.cooldown_until = time.monotonic() + BACKOFF_BASE * (2 ** state.strikes)
+                state.strikes += 1
+                print(f"🐢 Blocked by {urlparse(url).netloc}. Interval now {state.interval:.1f}s, cooling down {BACKOFF_BASE * 2 ** (state.strikes - 1):.0f}s.")
+            else:
+                state.ok_streak += 1
+                state.strikes = 0
+                if state.ok_streak >= SPEEDUP_AFTER:
+                    state.ok_streak = 0
+                    state.interval = max(self.settings['min'], state.interval * SPEEDUP_FACTOR)
+
+    def stats(self):
+        """Per-host statistics as a dict."""
+        with self.lock:
+            return {
+                host: {
+                    'requests': s.requests,
+                    'blocked': s.blocked,
+                    'interval': round(s.interval, 2),
+                    'waited_s': round(s.waited, 1),
+                }
+                for host, s in self.hosts.items()
+            }
+
+    def print_stats(self):
+        for host, s in self.stats().items():
+            print(f"📈 {host}: {s['requests']} requests, {s['blocked']} blocked, "
+                  f"interval {s['interval']}s, {s['waited_s']}s spent waiting")
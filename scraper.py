@@ -1,21 +1,25 @@
 # scraper.py (Resumable and Persistent - FINAL)
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import time
-import random
 import json
 import re
+import os
+import time
+import argparse
 # Removed 'atexit' import for explicit save control
-from config import BASE_SEARCH_URL
+from config import BASE_SEARCH_URL, MAX_SCRAPE_PAGE
+import listing_store
+from price_history import PriceHistory, CHANGED, RELISTED
+from browser_session import initialize_driver, CHROME_DEBUGGER_ADDRESS
+from rate_limiter import AdaptivePacer, looks_blocked
 
 # --- File Definition ---
 STATE_FILE = "initial_scrape_state.json" 
 OUTPUT_FILE = "listings_data.json" # <--- New definition for final output
+JOURNAL_FILE = "initial_scrape_state.journal.jsonl" # Append-only per-page checkpoints
+COMPACT_EVERY = 20 # Fold the journal into STATE_FILE after this many pages
 
 # --- Global State for Persistence ---
 scrape_state = {
@@ -24,9 +28,53 @@ scrape_state = {
     'max_page_found': 1,
 }
 driver = None
+pages_since_compact = 0
 
 # --- Persistence Functions ---
 
+def append_journal(page, new_listings):
+    """Appends one completed page to the journal and fsyncs it.
+
+    Cost is proportional to the listings found on this page, not to the whole state.
+    """
+    entry = {
+        'last_page': scrape_state['last_page'],
+        'max_page_found': scrape_state['max_page_found'],
+        'listings': {listing_store.obid_for(item): item for item in new_listings},
+    }
+    try:
+        with open(JOURNAL_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+    except Exception as e:
+        print(f"❌ Failed to append page {page} to journal: {e}")
+
+def replay_journal():
+    """Applies journal entries written since the last compaction. Returns the number replayed."""
+    replayed = 0
+    try:
+        with open(JOURNAL_FILE, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-write; everything before it is intact
+                    break
+                scrape_state['listings'].update(entry.get('listings', {}))
+                scrape_state['last_page'] = entry.get('last_page', scrape_state['last_page'])
+                scrape_state['max_page_found'] = max(scrape_state['max_page_found'], entry.get('max_page_found', 1))
+                replayed += 1
+    except FileNotFoundError:
+        pass
+    return replayed
+
+def compact_journal():
+    """Folds the journal into a fresh STATE_FILE snapshot and truncates the journal."""
+    global pages_since_compact
+    save_state()
+    pages_since_compact = 0
+
 def load_state():
     """Loads the last saved state from the file."""
     global scrape_state
@@ -49,6 +97,12 @@ def load_state():
             print("Starting new scrape: no saved state found.")
             pass
 
+    # Re-apply any pages checkpointed after the last snapshot
+    replayed = replay_journal()
+    if replayed:
+        print(f"✅ Replayed {replayed} journaled pages. Resuming from page {scrape_state['last_page']} with {len(scrape_state['listings'])} listings.")
+        compact_journal()
+
 
 def save_state():
     """Saves the current state of listings and the last page to the STATE file."""
@@ -58,9 +112,14 @@ def save_state():
         return
         
     try:
-        # Save to the state file
-        with open(STATE_FILE, 'w', encoding='utf-8') as f:
+        # Write the snapshot atomically, then drop the journal it now contains
+        tmp_file = STATE_FILE + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
             json.dump(scrape_state, f, ensure_ascii=False, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, STATE_FILE)
+        open(JOURNAL_FILE, 'w').close()
         print(f"\n✅ Scrape state checkpoint saved to {STATE_FILE}. Last processed page: {scrape_state['last_page']}")
     except Exception as e:
         print(f"❌ Failed to save scrape state: {e}")
@@ -74,35 +133,98 @@ def save_final_output(listings_list):
     except Exception as e:
         print(f"❌ Failed to save final output to {OUTPUT_FILE}: {e}")
 
-# --- Driver Initialization (omitted for brevity, assume correct) ---
-def initialize_driver():
-    """Initializes and returns a Chrome WebDriver configured to look more human."""
-    global driver
-    options = webdriver.ChromeOptions()
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option('useAutomationExtension', False)
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
-    return driver
-# ----------------------------------------------------------------------
-
-
-def scrape_listings():
-    """Main scraping function that iterates through all pages and extracts data."""
-    global driver
-    
-    MAIN_CONTAINER_SELECTOR = "div.HybridViewListViewContainer[data-elementtype='hybridViewMainListings']"
-    APARTMENT_CARD_SELECTOR = ".listing-card[data-obid]"
-    ATTRIBUTES_CONTAINER_SELECTOR = "div.card-attributes.margin-vertical-sm"
+# --- Card Extraction ---
+MAIN_CONTAINER_SELECTOR = "div.HybridViewListViewContainer[data-elementtype='hybridViewMainListings']"
+APARTMENT_CARD_SELECTOR = ".listing-card[data-obid]"
+ATTRIBUTES_CONTAINER_SELECTOR = "div.card-attributes.margin-vertical-sm"
 
-    # Start from the last successful page number saved in state
-    page = scrape_state['last_page']
+# Reads every card of the page in a single round trip to chromedriver.
+EXTRACT_CARDS_JS = """
+const container = arguments[0];
+const text = (root, selector) => {
+    const el = root.querySelector(selector);
+    return el ? el.innerText : null;
+};
+return Array.from(container.querySelectorAll(arguments[1])).map(card => {
+    const attributes = card.querySelector(arguments[2]);
+    return {
+        obid: card.getAttribute('data-obid'),
+        title: text(card, "h2[data-testid='headline']"),
+        attributes: attributes ? Array.from(attributes.querySelectorAll('dl')).map(dl => text(dl, 'dd') || '') : null,
+        address: text(card, "div[data-testid='hybridViewAddress']"),
+    };
+});
+"""
+
+def build_listing(obid, title, address, dd_texts):
+    """Turns the raw card texts into the listing dict (same rules for both extraction paths).
+
+    scraped_at is the time the card was read, as stored by listing_store (ranking uses it for freshness).
+    """
+    price, size_m2, rooms = "N/A", "N/A", "N/A"
+    for dd_text in dd_texts:
+        if "€" in dd_text: price = dd_text.strip()
+        elif "m²" in dd_text: size_m2 = dd_text.strip()
+        elif "," not in dd_text and "." not in dd_text and len(dd_text) < 6: rooms = dd_text.strip()
+    link = f"https://www.immobilienscout24.de/expose/{obid}"
+    return {'title': title.strip(), 'address': address.strip(), 'price': price, 'size_m2': size_m2, 'rooms': rooms, 'link': link,
+            'scraped_at': time.time()}
+
+def extract_cards_js(driver, main_container):
+    """Returns the raw data of all cards as a list of dicts, or None if the script failed."""
+    try:
+        return driver.execute_script(EXTRACT_CARDS_JS, main_container, APARTMENT_CARD_SELECTOR, ATTRIBUTES_CONTAINER_SELECTOR)
+    except Exception as e:
+        print(f"⚠️ Bulk card extraction failed ({e}). Falling back to per-element extraction.")
+        return None
+
+def parse_card_payload(raw):
+    """Builds a listing from one entry of the EXTRACT_CARDS_JS result."""
+    if raw.get('title') is None or raw.get('attributes') is None or raw.get('address') is None:
+        raise ValueError("card is missing headline, attributes or address")
+    return build_listing(raw['obid'], raw['title'], raw['address'], raw['attributes'])
+
+def extract_card_element(card):
+    """Per-element extraction path (one chromedriver call per field)."""
+    obid = card.get_attribute("data-obid")
+    title = card.find_element(By.CSS_SELECTOR, "h2[data-testid='headline']").text
+
+    # --- Attribute Extraction ---
+    attributes_container = card.find_element(By.CSS_SELECTOR, ATTRIBUTES_CONTAINER_SELECTOR)
+    dd_texts = [dl.find_element(By.TAG_NAME, "dd").text for dl in attributes_container.find_elements(By.TAG_NAME, "dl")]
+
+    # --- Address Extraction ---
+    address = card.find_element(By.CSS_SELECTOR, "div[data-testid='hybridViewAddress']").text
+    return build_listing(obid, title, address, dd_texts)
+
+
+def iter_new_listings(incremental=False, stop_after=1, browser=None, pacer=None, history=None, snapshot=True):
+    """Scrapes result pages and yields each page's NEW or CHANGED listings as soon as that page is checkpointed.
+
+    Every card is compared with its last observation (see price_history.py), so price drops,
+    edits and relistings come through again. incremental=True starts at page 1 and stops once
+    `stop_after` consecutive pages contain nothing new or changed (search sorted by "Newest"). MAX_SCRAPE_PAGE is always a hard cap.
+    Pass an already running `browser` (left open afterwards), a `pacer` and a `history` to keep them across calls.
+    snapshot=False skips the full state file and pacing stats at the end (the journal already has every page);
+    long-running callers save the state once when they stop.
+    """
+    global driver, pages_since_compact
     
+    # Start from the last successful page number saved in state
+    page = 1 if incremental else scrape_state['last_page']
+    known_pages_in_row = 0
+    pacer = pacer or AdaptivePacer('search')
+    history = history or PriceHistory()
+    history.start_crawl()
+
     try:
-        driver = initialize_driver()
+        driver = browser or initialize_driver(profile="scraper")
         
         while True:
+            if MAX_SCRAPE_PAGE and page > MAX_SCRAPE_PAGE:
+                print(f"🛑 Reached MAX_SCRAPE_PAGE ({MAX_SCRAPE_PAGE}). Stopping scrape.")
+                break
+
             # Code to build current_url... (omitted for brevity, remains the same)
             if page == 1:
                 current_url = BASE_SEARCH_URL
@@ -114,14 +236,16 @@ def scrape_listings():
                      current_url = f"{BASE_SEARCH_URL}&pagenumber={page}" 
 
             print(f"\nScraping page {page}: {current_url}")
+            pacer.wait(current_url)
             driver.get(current_url)
-            time.sleep(random.uniform(5, 10))
             
             # ... CAPTCHA CHECK AND PAUSE logic remains the same ...
-            if "captcha" in driver.current_url.lower() or driver.title == "Zugriff verweigert":
+            blocked = looks_blocked(driver.current_url, driver.title)
+            pacer.report(current_url, blocked)
+            if blocked:
                 print("🚨 CAPTCHA or Access denied detected! Please solve manually.")
                 input("Press ENTER after solving CAPTCHA...")
-                if "captcha" in driver.current_url.lower() or driver.title == "Zugriff verweigert":
+                if looks_blocked(driver.current_url, driver.title):
                     print("🛑 CAPTCHA persists. Stopping scrape.")
                     break
             
@@ -136,43 +260,62 @@ def scrape_listings():
                     print("⚠️ No individual apartment cards found. Reached end of results.")
                     break
 
-                # STEP 3: Iterate and Extract Data (logic remains the same)
-                listings_on_page = 0
-                for card in apartment_cards:
-                    obid = card.get_attribute("data-obid")
-                    if obid in scrape_state['listings']: continue
-                        
-                    # ... Data extraction logic (omitted for brevity) ...
-                    try:
-                        link = f"https://www.immobilienscout24.de/expose/{obid}"
-                        title = card.find_element(By.CSS_SELECTOR, "h2[data-testid='headline']").text.strip()
-                        
-                        # --- Attribute Extraction ---
-                        attributes_container = card.find_element(By.CSS_SELECTOR, ATTRIBUTES_CONTAINER_SELECTOR)
-                        dl_elements = attributes_container.find_elements(By.TAG_NAME, "dl")
-                        price, size_m2, rooms = "N/A", "N/A", "N/A"
-                        for dl in dl_elements:
-                            dd_text = dl.find_element(By.TAG_NAME, "dd").text
-                            if "€" in dd_text: price = dd_text.strip()
-                            elif "m²" in dd_text: size_m2 = dd_text.strip()
-                            elif "," not in dd_text and "." not in dd_text and len(dd_text) < 6: rooms = dd_text.strip()
-                            
-                        # --- Address Extraction ---
-                        address = card.find_element(By.CSS_SELECTOR, "div[data-testid='hybridViewAddress']").text.strip()
-
-                        property_data = {'title': title, 'address': address, 'price': price, 'size_m2': size_m2, 'rooms': rooms, 'link': link}
-                        
-                        scrape_state['listings'][obid] = property_data
-                        listings_on_page += 1
+                # STEP 3: Extract every card in one script call; fall back to per-element lookups
+                card_payload = extract_cards_js(driver, main_container)
+                if card_payload is not None:
+                    page_cards = [(raw.get('obid'), lambda raw=raw: parse_card_payload(raw)) for raw in card_payload]
+                else:
+                    page_cards = [(card.get_attribute("data-obid"), lambda card=card: extract_card_element(card)) for card in apartment_cards]
+
+                page_listings = []
+                for obid, extract in page_cards:
+                    # The per-element path costs several round trips per card; there, known cards are not re-read
+                    if card_payload is None and obid in scrape_state['listings']: continue
 
+                    try:
+                        page_listings.append(extract())
                     except Exception as e:
                         print(f"Error extracting data from card (OBID: {obid if obid else 'N/A'}): {e}. Skipping this listing.")
                         continue
 
-                print(f"Successfully extracted {listings_on_page} NEW listings from page {page}.")
+                # Only cards that are new or whose hash changed (price, title, ...) go on
+                new_listings = []
+                changed_obids = []
+                for property_data, kind in history.observe(page_listings, page=page):
+                    obid = listing_store.obid_for(property_data)
+                    if obid in scrape_state['listings'] and kind not in (CHANGED, RELISTED):
+                        continue  # First crawl since the history was introduced: baseline only
+                    if obid in scrape_state['listings']:
+                        changed_obids.append(obid)
+                        print(f"   🔁 {'Relisted' if kind == RELISTED else 'Changed'}: {property_data['title']} ({property_data['price']})")
+                    scrape_state['listings'][obid] = property_data
+                    new_listings.append(property_data)
+
+                print(f"Successfully extracted {len(new_listings) - len(changed_obids)} NEW and {len(changed_obids)} CHANGED listings from page {page}.")
+                if new_listings:
+                    listing_store.upsert_listings(new_listings, 'scraped')
+                if changed_obids:
+                    # Old rents and NO_OFFER_FOUND would make the detail scraper skip these rows
+                    listing_store.reset_stage(changed_obids, 'enriched')
                 
                 # Update and move to next page
-                scrape_state['last_page'] = page
+                # (incremental runs keep last_page so a full crawl can still resume where it stopped)
+                if not incremental:
+                    scrape_state['last_page'] = page
+                scrape_state['max_page_found'] = max(scrape_state['max_page_found'], page)
+                append_journal(page, new_listings)
+                pages_since_compact += 1
+                if pages_since_compact >= COMPACT_EVERY:
+                    compact_journal()
+
+                for property_data in new_listings:
+                    yield property_data
+
+                if incremental:
+                    known_pages_in_row = 0 if new_listings else known_pages_in_row + 1
+                    if known_pages_in_row >= stop_after:
+                        print(f"✅ {known_pages_in_row} page(s) in a row with only known, unchanged listings. Incremental scrape done.")
+                        break
                 page += 1
                 
             except Exception as e:
@@ -181,8 +324,21 @@ def scrape_listings():
                 break
 
     finally:
-        if driver: driver.quit()
-        save_state() # Always save checkpoint on exit
+        if driver and browser is None: driver.quit()
+        if snapshot:
+            pacer.print_stats()
+            save_state() # Always save checkpoint on exit
+
+
+def scrape_listings(incremental=False, stop_after=1):
+    """Main scraping function that iterates through all pages and extracts data."""
+    # Run on its own, the scraper is the only browser session and may use a running Chrome
+    browser = initialize_driver(profile="scraper", attach=CHROME_DEBUGGER_ADDRESS)
+    try:
+        for _ in iter_new_listings(incremental, stop_after, browser=browser):
+            pass
+    finally:
+        browser.quit()
 
     final_listings_list = list(scrape_state['listings'].values())
     save_final_output(final_listings_list) # Save the full list to the final output file
@@ -190,7 +346,12 @@ def scrape_listings():
     return final_listings_list
 
 if __name__ == '__main__':
-    print("Running resumable scrape...")
+    parser = argparse.ArgumentParser(description="Scrape ImmoScout24 search result pages.")
+    parser.add_argument("--incremental", action="store_true", help="Start at page 1 and stop at the first pages with no new listings")
+    parser.add_argument("--stop-after", type=int, default=1, help="Consecutive all-known pages before an incremental scrape stops (default: 1)")
+    args = parser.parse_args()
+
+    print("Running incremental scrape..." if args.incremental else "Running resumable scrape...")
     load_state() 
-    results = scrape_listings()
+    results = scrape_listings(incremental=args.incremental, stop_after=args.stop_after)
     print(f"\nTotal unique listings found across all sessions: {len(results)}")
\ No newline at end of file
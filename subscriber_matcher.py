@@ -0,0 +1,206 @@
+# subscriber_matcher.py (Routes every listing to all saved searches it matches, so one scrape serves many people)
+
+import argparse
+import bisect
+import re
+
+import filter_listings
+from berlin_zip_map import bezirk_for
+
+# --- File Definitions ---
+SUBSCRIBERS_FILE = "subscribers.toml"
+
+# --- Settings of a saved search: the filter profile keys plus keywords and a Telegram chat ---
+SUBSCRIPTION_KEYS = filter_listings.PROFILE_KEYS + ('keywords', 'exclude', 'chat_id')
+
+WORD_REGEX = re.compile(r'\w+')
+
+
+def make_subscription(name, **settings):
+    """A saved search. Unlike filter profiles, settings that are left out mean 'no restriction'."""
+    unknown = set(settings) - set(SUBSCRIPTION_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown setting(s) for subscriber '{name}': {', '.join(sorted(unknown))}")
+    subscription = {key: None for key in SUBSCRIPTION_KEYS}
+    subscription.update(settings)
+    subscription['name'] = name
+    subscription['districts'] = set(subscription['districts'] or ())
+    subscription['bezirke'] = set(subscription['bezirke'] or ())
+    subscription['keywords'] = {word.lower() for word in subscription['keywords'] or ()}
+    subscription['exclude'] = {word.lower() for word in subscription['exclude'] or ()}
+    return subscription
+
+
+def load_subscriptions(path=SUBSCRIBERS_FILE):
+    """Reads [subscribers.<name>] tables from a TOML file."""
+    try:
+        import tomllib
+    except ImportError:  # Python < 3.11
+        import tomli as tomllib
+    with open(path, 'rb') as f:
+        data = tomllib.load(f)
+    return [make_subscription(name, **settings) for name, settings in data.get('subscribers', {}).items()]
+
+
+def title_words(listing):
+    return set(WORD_REGEX.findall((listing.get('title') or '').lower()))
+
+
+def subscription_matches(subscription, listing):
+    """Checks one saved search against one listing directly (the matcher below does this for all at once)."""
+    if subscription['districts'] or subscription['bezirke']:
+        district = listing.get('district')
+        bezirk = listing.get('bezirk') or bezirk_for(district)
+        if district not in subscription['districts'] and bezirk not in subscription['bezirke']:
+            return False
+    for column, (low_key, high_key, *_) in filter_listings.RANGE_COLUMNS.items():
+        low = subscription[low_key]
+        high = subscription[high_key] if high_key else None
+        value = listing.get(column)
+        if value is None:
+            if low or high:
+                return False
+            continue
+        if (low and value < low) or (high and value > high):
+            return False
+    if subscription['keywords'] or subscription['exclude']:
+        words = title_words(listing)
+        if subscription['keywords'] and not subscription['keywords'] & words:
+            return False
+        if subscription['exclude'] & words:
+            return False
+    return True
+
+
+class IntervalIndex:
+    """Answers 'which subscriptions' [low, high] ranges contain x?' with one bisect.
+
+    All range bounds split the number line into points and the open gaps between them.
+    Every slot stores the bitmask of subscriptions covering it (bit i = subscription i).
+    """
+
+    def __init__(self, ranges):
+        """ranges: list of (low, high) per subscription; None or 0 is an open bound."""
+        self.bounds = sorted({bound for low, high in ranges for bound in (low, high) if bound})
+        # Slot 2k is the gap before bounds[k], slot 2k+1 is bounds[k] itself; the last slot is above all bounds
+        starts = {}
+        ends = {}
+        self.unbounded = 0
+        for bit, (low, high) in enumerate(ranges):
+            if not low and not high:
+                self.unbounded |= 1 << bit
+            if low and high and low > high:
+                continue  # Matches nothing
+            first = 2 * bisect.bisect_left(self.bounds, low) + 1 if low else 0
+            last = 2 * bisect.bisect_left(self.bounds, high) + 1 if high else 2 * len(self.bounds)
+            starts[first] = starts.get(first, 0) | 1 << bit
+            ends[last] = ends.get(last, 0) | 1 << bit
+
+        self.slots = []
+        covering = 0
+        for slot in range(2 * len(self.bounds) + 1):
+            covering |= starts.get(slot, 0)
+            self.slots.append(covering)
+            covering &= ~ends.get(slot, 0)
+
+    def stab(self, value):
+        """Bitmask of subscriptions whose range contains `value` (None: only those without a range)."""
+        if value is None:
+            return self.unbounded
+        index = bisect.bisect_left(self.bounds, value)
+        if index < len(self.bounds) and self.bounds[index] == value:
+            return self.slots[2 * index + 1]
+        return self.slots[2 * index]
+
+
+class SubscriberMatcher:
+    """Holds many saved searches and finds all that match a listing without checking each one.
+
+    Districts, Bezirke and title keywords go into inverted indexes (value -> bitmask of
+    subscriptions); numeric ranges into IntervalIndex. A match is the AND of those masks.
+    """
+
+    def __init__(self, subscriptions):
+        self.subscriptions = list(subscriptions)
+        self.everyone = (1 << len(self.subscriptions)) - 1
+
+        self.any_area = 0
+        self.by_district = {}
+        self.by_bezirk = {}
+        self.with_keywords = 0
+        self.by_keyword = {}
+        self.by_excluded = {}
+        for bit, subscription in enumerate(self.subscriptions):
+            flag = 1 << bit
+            if not subscription['districts'] and not subscription['bezirke']:
+                self.any_area |= flag
+            for district in subscription['districts']:
+                self.by_district[district] = self.by_district.get(district, 0) | flag
+            for bezirk in subscription['bezirke']:
+                self.by_bezirk[bezirk] = self.by_bezirk.get(bezirk, 0) | flag
+            if subscription['keywords']:
+                self.with_keywords |= flag
+            for word in subscription['keywords']:
+                self.by_keyword[word] = self.by_keyword.get(word, 0) | flag
+            for word in subscription['exclude']:
+                self.by_excluded[word] = self.by_excluded.get(word, 0) | flag
+
+        # Subscriptions that need the title words looked at
+        self.word_filtered = self.with_keywords
+        for flags in self.by_excluded.values():
+            self.word_filtered |= flags
+
+        self.ranges = {
+            column: IntervalIndex([(s[low_key], s[high_key] if high_key else None) for s in self.subscriptions])
+            for column, (low_key, high_key, *_) in filter_listings.RANGE_COLUMNS.items()
+        }
+
+    def match_mask(self, listing):
+        district = listing.get('district')
+        mask = self.any_area | self.by_district.get(district, 0) | self.by_bezirk.get(listing.get('bezirk') or bezirk_for(district), 0)
+        for column, index in self.ranges.items():
+            if not mask:
+                return 0
+            mask &= index.stab(listing.get(column))
+
+        if mask & self.word_filtered:
+            words = title_words(listing)
+            keyword_hits = 0
+            excluded = 0
+            for word in words:
+                keyword_hits |= self.by_keyword.get(word, 0)
+                excluded |= self.by_excluded.get(word, 0)
+            mask &= (self.everyone & ~self.with_keywords) | keyword_hits
+            mask &= ~excluded
+        return mask
+
+    def match(self, listing):
+        """Saved searches (dicts) that the listing matches, in the order they were given."""
+        mask = self.match_mask(listing)
+        matched = []
+        while mask:
+            low_bit = mask & -mask
+            matched.append(self.subscriptions[low_bit.bit_length() - 1])
+            mask ^= low_bit
+        return matched
+
+    def route(self, listings):
+        """Returns {subscriber name: [matching listings]} for a batch."""
+        routed = {subscription['name']: [] for subscription in self.subscriptions}
+        for listing in listings:
+            for subscription in self.match(listing):
+                routed[subscription['name']].append(listing)
+        return routed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Match the cleaned listings against every saved search.")
+    parser.add_argument("subscribers", nargs="?", default=SUBSCRIBERS_FILE, help=f"TOML file (default: {SUBSCRIBERS_FILE})")
+    args = parser.parse_args()
+
+    matcher = SubscriberMatcher(load_subscriptions(args.subscribers))
+    data = filter_listings.load_data()
+    for name, matches in matcher.route(data).items():
+        matches.sort(key=lambda x: (x.get('warm_miete_numeric') or float('inf'), -(x.get('rooms_numeric') or 0)))
+        print(f"👤 {name}: {len(matches)} matches")
+        filter_listings.save_filtered_data(matches, filter_listings.output_file_for(name))
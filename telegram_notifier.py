@@ -1,24 +1,232 @@
-# slack_notifier.py
+# telegram_notifier.py (Pooled, batched and rate-aware Telegram notifications)
+
+import queue
+import threading
+import time
 
 import requests
-import json
+from requests.adapters import HTTPAdapter
+
 from config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
 
-TELEGRAM_API = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+TELEGRAM_API_BASE = "https://api.telegram.org"
+MAX_MESSAGE_LENGTH = 4096   # Telegram's limit for one text message
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0          # Seconds; doubles with every retry
+MIN_SEND_INTERVAL = 1.0     # Telegram allows roughly one message per second per chat
+BOT_SEND_INTERVAL = 1 / 30  # ... and roughly 30 messages per second per bot across all chats
+BATCH_SEPARATOR = "\n\n"
 
-def send_telegram_message(text):
-    """Sends a message to the specified Telegram chat."""
-    payload = {
-        'chat_id': TELEGRAM_CHAT_ID,
-        'text': text,
-        'parse_mode': 'Markdown'
-    }
+
+class TelegramNotifier:
+    """Sends messages through one keep-alive session with retries, to the default chat or any other one.
+
+    Paced per chat and per bot. Honors `retry_after` on 429 responses and backs off exponentially
+    on network and 5xx errors.
+    api_base can point at a local stub server for testing.
+    """
+
+    def __init__(self, token=TELEGRAM_BOT_TOKEN, chat_id=TELEGRAM_CHAT_ID, api_base=TELEGRAM_API_BASE):
+        self.url = f"{api_base}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.lock = threading.Lock()
+        self.last_sent = 0.0
+        self.last_sent_to = {}  # chat_id -> monotonic time of the last message to that chat
+        self.sent = 0
+        self.failed = 0
+
+    def send(self, text, parse_mode='Markdown', chat_id=None):
+        """Sends one message (split if longer than Telegram allows). Returns the last API response or None.
+
+        chat_id defaults to the notifier's chat.
+        """
+        result = None
+        for chunk in split_message(text):
+            result = self._send_chunk(chunk, parse_mode, chat_id or self.chat_id)
+            if result is None:
+                return None
+        return result
+
+    def _send_chunk(self, text, parse_mode, chat_id):
+        payload = {'chat_id': chat_id, 'text': text}
+        if parse_mode:
+            payload['parse_mode'] = parse_mode
+
+        for attempt in range(MAX_RETRIES):
+            with self.lock:
+                ready_at = max(self.last_sent + BOT_SEND_INTERVAL, self.last_sent_to.get(chat_id, 0.0) + MIN_SEND_INTERVAL)
+                wait = ready_at - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                self.last_sent = self.last_sent_to[chat_id] = time.monotonic()
+
+            response = None
+            try:
+                response = self.session.post(self.url, data=payload, timeout=15)
+            except requests.RequestException as e:
+                print(f"❌ Failed to send Telegram message: {e}")
+
+            if response is not None:
+                if response.ok:
+                    self.sent += 1
+                    return response.json()
+
+                body = _json_or_empty(response)
+                if response.status_code == 429:
+                    retry_after = body.get('parameters', {}).get('retry_after', BACKOFF_BASE * 2 ** attempt)
+                    print(f"⏳ Telegram rate limit hit. Retrying in {retry_after}s.")
+                    time.sleep(retry_after)
+                    continue
+                if response.status_code == 400 and 'parse' in body.get('description', '').lower() and 'parse_mode' in payload:
+                    # Listing titles can contain stray Markdown characters; send as plain text instead
+                    payload.pop('parse_mode')
+                    continue
+                print(f"❌ Failed to send Telegram message: HTTP {response.status_code}")
+                print(f"Response content: {response.text}")
+                if response.status_code < 500:
+                    break
+
+            time.sleep(BACKOFF_BASE * 2 ** attempt)
+
+        self.failed += 1
+        return None
+
+    def close(self):
+        self.session.close()
+
+
+class NotificationQueue:
+    """Background sender: callers enqueue texts and continue immediately.
+
+    Queued texts are packed into as few messages per chat as fit into MAX_MESSAGE_LENGTH.
+    One queue (one thread, one session) serves every chat the bot writes to.
+    """
+
+    def __init__(self, notifier=None):
+        self.notifier = notifier or get_notifier()
+        self.pending = queue.Queue()
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def enqueue(self, text, on_sent=None, chat_id=None):
+        """Queues a text for chat_id (default: the notifier's chat).
+
+        on_sent() is called once the message containing it was delivered.
+        """
+        self.pending.put((text, on_sent, chat_id))
+
+    def _run(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                break
+            batch = [item]
+            stop = False
+            # Take everything that is already waiting
+            while True:
+                try:
+                    nxt = self.pending.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+
+            by_chat = {}
+            for text, on_sent, chat_id in batch:
+                by_chat.setdefault(chat_id, []).append((text, on_sent))
+            for chat_id, items in by_chat.items():
+                start = 0
+                for message, count in pack_messages([text for text, _ in items], with_counts=True):
+                    if self.notifier.send(message, chat_id=chat_id) is not None:
+                        for _, on_sent in items[start:start + count]:
+                            if on_sent:
+                                on_sent()
+                    start += count
+            if stop:
+                break
+
+    def close(self):
+        """Sends everything still queued, then stops the background thread."""
+        self.pending.put(None)
+        self.worker.join()
+        print(f"📨 Telegram: {self.notifier.sent} messages sent, {self.notifier.failed} failed.")
+
+
+def split_message(text, limit=MAX_MESSAGE_LENGTH):
+    """Splits a text into chunks no longer than `limit`, preferring line breaks."""
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit)
+        if cut <= 0:
+            cut = limit
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip("\n")
+    chunks.append(text)
+    return chunks
+
+
+def pack_messages(texts, limit=MAX_MESSAGE_LENGTH, with_counts=False):
+    """Joins consecutive texts into as few messages as possible without exceeding `limit`.
+
+    with_counts=True returns (message, number_of_texts_in_it) pairs.
+    """
+    packed = []
+    current, count = "", 0
+    for text in texts:
+        candidate = f"{current}{BATCH_SEPARATOR}{text}" if count else text
+        if len(candidate) <= limit or not count:
+            current, count = candidate, count + 1
+            continue
+        packed.append((current, count))
+        current, count = text, 1
+    if count:
+        packed.append((current, count))
+    return packed if with_counts else [message for message, _ in packed]
+
+
+def _json_or_empty(response):
     try:
-        response = requests.post(TELEGRAM_API, data=payload)
-        response.raise_for_status()
         return response.json()
-    except requests.RequestException as e:
-        print(f"❌ Failed to send Telegram message: {e}")
-        if response is not None:
-             print(f"Response content: {response.text}")
-        return None
\ No newline at end of file
+    except ValueError:
+        return {}
+
+
+_default_notifier = None
+
+
+def get_notifier():
+    """Shared notifier for the configured bot and chat."""
+    global _default_notifier
+    if _default_notifier is None:
+        _default_notifier = TelegramNotifier()
+    return _default_notifier
+
+
+def send_telegram_message(text):
+    """Sends a message to the specified Telegram chat."""
+    return get_notifier().send(text)
+
+
+def format_listing_message(listing):
+    """Formats a single search-card listing into a concise Markdown string."""
+    return (
+        f"• *{listing['title']}*\n"
+        f"  €{listing.get('price', 'N/A')} | Rooms: {listing.get('rooms', 'N/A')} | Size: {listing.get('size_m2', 'N/A')}\n"
+        f"  Location: {listing['address']}\n"
+        f"  [View Listing]({listing['link']})\n"
+    )
+
+
+def format_match_message(listing):
+    """Formats a matched (enriched and cleaned) listing as a Markdown message."""
+    return (
+        f"🏠 *{listing['title']}*\n"
+        f"📍 {listing.get('district', 'N/A')} ({listing.get('address', 'N/A')})\n"
+        f"💰 Warm: {listing.get('warm_miete_numeric')} € | 📐 {listing.get('size_numeric')} m² | 🚪 {listing.get('rooms_numeric')} Rooms\n"
+        f"🔗 [View Listing]({listing['link']})"
+    )
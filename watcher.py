@@ -0,0 +1,210 @@
+# watcher.py (Long-running watch mode: poll newest listings, notify matches within seconds)
+
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import scraper
+import listing_store
+import data_cleaner
+from browser_session import initialize_driver
+from rate_limiter import AdaptivePacer
+from pipeline import Enricher, process_listing
+from telegram_notifier import send_telegram_message, format_match_message
+from notification_ledger import NotificationLedger
+from price_history import PriceHistory
+import config
+
+# Watch settings, with defaults for config files that predate watch mode
+WATCH_INTERVAL_SECONDS = getattr(config, 'WATCH_INTERVAL_SECONDS', 60)
+WATCH_JITTER = getattr(config, 'WATCH_JITTER', 0.3)
+STATUS_PORT = getattr(config, 'STATUS_PORT', 8765)
+
+LATENCY_WINDOW = 200  # Number of recent notifications kept for the latency statistics
+
+
+class WatchStatus:
+    """Counters and latency samples shared between the poll loop and the status endpoint."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.polls = 0
+        self.failed_polls = 0
+        self.last_poll_at = None
+        self.last_success_at = None
+        self.last_error = None
+        self.new_listings = 0
+        self.matches = 0
+        # Upper bound: notify time - previous poll (the listing was not on the page back then)
+        self.detection_latency = []
+        # Lower bound: notify time - moment the card was read in this poll
+        self.processing_latency = []
+
+    def record_latency(self, detection, processing):
+        with self.lock:
+            self.detection_latency = (self.detection_latency + [detection])[-LATENCY_WINDOW:]
+            self.processing_latency = (self.processing_latency + [processing])[-LATENCY_WINDOW:]
+
+    @staticmethod
+    def _summary(samples):
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return {
+            'count': len(ordered),
+            'p50_s': round(statistics.median(ordered), 2),
+            'p95_s': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+            'max_s': round(ordered[-1], 2),
+        }
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'uptime_s': round(time.time() - self.started_at),
+                'polls': self.polls,
+                'failed_polls': self.failed_polls,
+                'last_poll_at': self.last_poll_at,
+                'last_success_at': self.last_success_at,
+                'last_error': self.last_error,
+                'new_listings': self.new_listings,
+                'matches': self.matches,
+                'detection_latency': self._summary(self.detection_latency),
+                'processing_latency': self._summary(self.processing_latency),
+                'known_listings': len(scraper.scrape_state['listings']),
+            }
+
+    def healthy(self):
+        """Healthy while the last successful poll is no older than three intervals."""
+        with self.lock:
+            reference = self.last_success_at or self.started_at
+        return time.time() - reference < 3 * WATCH_INTERVAL_SECONDS * (1 + WATCH_JITTER) + 60
+
+
+def start_status_server(status, port):
+    """Serves GET /health and GET /status (JSON) on localhost in a background thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/health':
+                ok = status.healthy()
+                self._send(200 if ok else 503, {'status': 'ok' if ok else 'stale'})
+            elif self.path == '/status':
+                self._send(200, status.snapshot())
+            else:
+                self._send(404, {'error': 'not found'})
+
+        def _send(self, code, body):
+            payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass  # Keep the terminal for poll output
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🩺 Status endpoint: http://127.0.0.1:{port}/status (health: /health)")
+    return server
+
+
+def poll_once(browser, search_pacer, history, enricher, ledger, status, previous_poll_at):
+    """One watch cycle: read the newest page(s), process new listings, notify matches immediately."""
+    poll_started = time.time()
+    stats = {'scraped': 0, 'matched': 0, 'offline': 0, 'blocked': 0}
+
+    listings = scraper.iter_new_listings(incremental=True, stop_after=1, browser=browser, pacer=search_pacer,
+                                         history=history, snapshot=False)
+    for listing in listings:
+        seen_at = time.time()
+        stats['scraped'] += 1
+        match = process_listing(listing, enricher, stats)
+        if not match or not ledger.should_notify(match):
+            continue
+
+        if send_telegram_message(format_match_message(match)) is not None:
+            ledger.mark_sent(match)
+        notified_at = time.time()
+        detection = notified_at - (previous_poll_at or poll_started)
+        processing = notified_at - seen_at
+        status.record_latency(detection, processing)
+        stats['matched'] += 1
+        print(f"🎯 MATCH notified: {match['title']} (detected within {detection:.1f}s, processed in {processing:.1f}s)")
+
+    with status.lock:
+        status.new_listings += stats['scraped']
+        status.matches += stats['matched']
+    return poll_started, stats
+
+
+def watch(use_http=True):
+    """Polls forever with a jittered interval. Stop with Ctrl+C."""
+    status = WatchStatus()
+    if STATUS_PORT:
+        start_status_server(status, STATUS_PORT)
+
+    scraper.load_state()
+    data_cleaner.parse_cache.load()
+    browser = initialize_driver(profile="scraper", attach="")
+    search_pacer = AdaptivePacer('search')
+    history = PriceHistory()   # Loaded once; keeps the card states in memory between polls
+    enricher = Enricher(use_http)
+    ledger = NotificationLedger()
+    previous_poll_at = None
+
+    print(f"👀 Watching for new listings every ~{WATCH_INTERVAL_SECONDS}s. Press Ctrl+C to stop.")
+    try:
+        while True:
+            with status.lock:
+                status.polls += 1
+                status.last_poll_at = time.time()
+            try:
+                if browser is None:
+                    browser = initialize_driver(profile="scraper", attach="")
+                previous_poll_at, stats = poll_once(browser, search_pacer, history, enricher, ledger, status, previous_poll_at)
+                with status.lock:
+                    status.last_success_at = time.time()
+                    status.last_error = None
+                print(f"🔁 Poll done: {stats['scraped']} new, {stats['matched']} matched.")
+            except Exception as e:
+                with status.lock:
+                    status.failed_polls += 1
+                    status.last_error = str(e)
+                print(f"❌ Poll failed: {e}")
+                # A dead browser session is the usual cause; start a fresh one for the next poll
+                # (if that fails too, the next poll tries again)
+                try:
+                    if browser:
+                        browser.quit()
+                except Exception:
+                    pass
+                browser = None
+
+            delay = WATCH_INTERVAL_SECONDS * random.uniform(1 - WATCH_JITTER, 1 + WATCH_JITTER)
+            time.sleep(delay)
+    except KeyboardInterrupt:
+        print("\n🛑 Watch stopped.")
+    finally:
+        if browser:
+            browser.quit()
+        enricher.close()
+        scraper.save_state()
+        search_pacer.print_stats()
+        listing_store.export_json()
+        data_cleaner.parse_cache.save()
+        data_cleaner.parse_cache.print_stats()
+        print(json.dumps(status.snapshot(), indent=4, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Poll the newest listings continuously and notify matches right away.")
+    parser.add_argument("--browser-only", action="store_true", help="Skip the plain-HTTP fast path for expose pages")
+    args = parser.parse_args()
+    watch(use_http=not args.browser_only)